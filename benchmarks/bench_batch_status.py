@@ -0,0 +1,79 @@
+"""Time of toggling many overlapping groups at once.
+
+Registers 10k commands, each in 3 (or 30) of 500 groups, and toggles a
+random half of the groups. :meth:`BaseCommandRegistry.batch_update_status`,
+which updates each affected command once with the net change, is compared
+with calling :meth:`BaseCommandRegistry.close` and
+:meth:`BaseCommandRegistry.open` name by name as it did before.
+
+Run from the repository root with ``python -m benchmarks.bench_batch_status``.
+"""
+import random
+import time
+
+from command4bot import Command, CommandRegistry
+
+COMMANDS = 10000
+GROUPS = 500
+ROUNDS = 20
+
+
+def build(rng: random.Random, groups_per_command: int) -> CommandRegistry:
+    reg = CommandRegistry()
+    groups = [f"group{i}" for i in range(GROUPS)]
+    for i in range(COMMANDS):
+
+        def handler(payload):
+            return payload
+
+        handler.__name__ = f"cmd{i}"
+        reg.register(
+            Command(
+                handler,
+                [handler.__name__],
+                rng.sample(groups, groups_per_command),
+                parameter_ignore=(),
+                context_ignore=(),
+                payload_parameter="payload",
+            )
+        )
+    return reg
+
+
+def name_by_name(reg, status_diff):
+    closed, opened = [], []
+    for name, status in status_diff.items():
+        if not status:
+            closed.extend(reg.close(name))
+    for name, status in status_diff.items():
+        if status:
+            opened.extend(reg.open(name))
+    return closed, opened
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    diffs = [
+        {
+            f"group{i}": rng.random() < 0.5
+            for i in rng.sample(range(GROUPS), GROUPS // 2)
+        }
+        for _ in range(ROUNDS)
+    ]
+    for groups_per_command in (3, 30):
+        for label, update in (
+            ("name by name", name_by_name),
+            ("batch", CommandRegistry.batch_update_status),
+        ):
+            reg = build(random.Random(1), groups_per_command)
+            changed = 0
+            start = time.perf_counter()
+            for diff in diffs:
+                closed, opened = update(reg, diff)
+                changed += len(closed) + len(opened)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{groups_per_command:>2} groups/command {label:>12}: "
+                f"{elapsed / ROUNDS * 1e3:7.2f} ms/batch, "
+                f"{changed / ROUNDS:8.1f} commands changed/batch"
+            )
@@ -0,0 +1,68 @@
+"""Throughput of commands sharing one cached context across threads.
+
+Compares the lock-free read of :attr:`Context.value` with a context taking a
+lock on every read, as it did before.
+
+Run from the repository root with
+``python -m benchmarks.bench_context_contention``.
+"""
+import threading
+import time
+
+from command4bot import CommandsManager, Context
+
+
+class LockedContext(Context):
+    def __init__(self, context_func) -> None:
+        super().__init__(context_func)
+        self._read_lock = threading.Lock()
+
+    @property
+    def value(self):
+        with self._read_lock:
+            return Context.value.fget(self)  # type: ignore
+
+
+def config():
+    return {"greeting": "hi"}
+
+
+def make_manager(context_class) -> CommandsManager:
+    mgr = CommandsManager()
+    mgr.context_reg.register(context_class(config))
+
+    @mgr.command
+    def greet(payload, config):
+        return config["greeting"]
+
+    return mgr
+
+
+def run(mgr: CommandsManager, threads: int, calls: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def target():
+        barrier.wait()
+        for _ in range(calls):
+            mgr.exec("greet")
+
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads * calls / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    calls = 50_000
+    for threads in (1, 4, 16):
+        for context_class in (LockedContext, Context):
+            mgr = make_manager(context_class)
+            throughput = run(mgr, threads, calls)
+            print(
+                f"{threads:>3} threads {context_class.__name__:>13}: "
+                f"{throughput:12,.0f} calls/s"
+            )
@@ -0,0 +1,62 @@
+"""Per-message cost of fallback handlers which rarely apply.
+
+Registers 30 fallback handlers, each only responding to input matching a
+pattern or starting with a prefix. Handlers checking the input themselves,
+as they had to before, are compared with the same handlers declaring guards,
+which :meth:`FallbackRegistry.candidates` checks all at once.
+
+Run from the repository root with ``python -m benchmarks.bench_fallback``.
+"""
+import re
+import timeit
+
+from command4bot import CommandsManager
+
+HANDLERS = 30
+MESSAGES = [
+    "good morning everyone",
+    "did anyone see the game last night?",
+    "lol",
+    "I will be late today, sorry",
+]
+
+
+def build(guarded: bool) -> CommandsManager:
+    mgr = CommandsManager(config=dict(enable_default_fallback=False))
+    for i in range(HANDLERS):
+        if i % 2:
+            guard = {"pattern": rf"\bkeyword{i}\b"}
+            check = re.compile(guard["pattern"]).search
+        else:
+            guard = {"prefix": f"!cmd{i}"}
+            check = re.compile(re.escape(guard["prefix"])).match
+
+        if guarded:
+
+            def fallback(content, _i=i):
+                return f"handled by {_i}"
+
+            mgr.fallback(fallback, **guard)
+        else:
+
+            def fallback(content, _i=i, _check=check):
+                if not _check(content):
+                    return None
+                return f"handled by {_i}"
+
+            mgr.fallback(fallback)
+    return mgr
+
+
+if __name__ == "__main__":
+    for label, guarded in (("checked in handlers", False), ("guards", True)):
+        mgr = build(guarded)
+        number = 20000
+        elapsed = timeit.timeit(
+            lambda: [mgr.exec(message) for message in MESSAGES],
+            number=number,
+        )
+        print(
+            f"{label:>20}: "
+            f"{elapsed / number / len(MESSAGES) * 1e6:6.2f} us/message"
+        )
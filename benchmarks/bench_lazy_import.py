@@ -0,0 +1,80 @@
+"""Startup time of registering a large synthetic plugin set.
+
+Generates 40 plugin modules with 20 commands each (800 commands). Every
+module does some work on import, standing in for heavy dependencies.
+Registering them eagerly with :meth:`CommandsManager.command` is compared
+with :meth:`CommandsManager.lazy_command`, which imports nothing.
+
+Run from the repository root with ``python -m benchmarks.bench_lazy_import``.
+"""
+import importlib
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from command4bot import CommandsManager
+
+MODULES = 40
+COMMANDS_PER_MODULE = 20
+
+HEADER = """
+# Stand-in for heavy dependencies
+_table = sorted(str(i) for i in range(30000))
+"""
+
+COMMAND = '''
+def cmd_{module}_{index}(payload):
+    """Command {index} of plugin {module}"""
+    return payload
+'''
+
+
+def generate(root: Path, package: str) -> None:
+    (root / package).mkdir()
+    (root / package / "__init__.py").write_text("")
+    for module in range(MODULES):
+        source = HEADER + "".join(
+            COMMAND.format(module=module, index=index)
+            for index in range(COMMANDS_PER_MODULE)
+        )
+        (root / package / f"plugin{module}.py").write_text(source)
+
+
+def names(package: str):
+    for module in range(MODULES):
+        for index in range(COMMANDS_PER_MODULE):
+            yield f"{package}.plugin{module}", f"cmd_{module}_{index}"
+
+
+def register_eagerly(package: str) -> CommandsManager:
+    mgr = CommandsManager()
+    for module_name, func_name in names(package):
+        module = importlib.import_module(module_name)
+        mgr.command(getattr(module, func_name), groups=[module_name])
+    return mgr
+
+
+def register_lazily(package: str) -> CommandsManager:
+    mgr = CommandsManager()
+    for module_name, func_name in names(package):
+        mgr.lazy_command(f"{module_name}:{func_name}", groups=[module_name])
+    return mgr
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.path.insert(0, tmp)
+        for register in (register_eagerly, register_lazily):
+            package = f"bench_plugins_{register.__name__}"
+            generate(Path(tmp), package)
+            start = time.perf_counter()
+            mgr = register(package)
+            startup = time.perf_counter() - start
+            start = time.perf_counter()
+            mgr.exec("cmd_0_0 hi")
+            first = time.perf_counter() - start
+            print(
+                f"{register.__name__:>16}: startup {startup * 1e3:8.1f} ms, "
+                f"first exec {first * 1e3:6.2f} ms"
+            )
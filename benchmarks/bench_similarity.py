@@ -0,0 +1,50 @@
+"""Time to find similar keywords for misspelled input.
+
+Compares :class:`NGramIndex` with the linear :class:`DifflibIndex` scan
+previously used by :meth:`BaseCommandRegistry.get_similar_commands`.
+
+Run from the repository root with ``python -m benchmarks.bench_similarity``.
+"""
+import random
+import string
+import time
+
+from command4bot import DifflibIndex, NGramIndex
+
+
+def build(index_class, keywords):
+    index = index_class()
+    for keyword in keywords:
+        index.add(keyword)
+    return index
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    queries = 200
+    letters = string.ascii_lowercase
+    for size in (1000, 5000, 20000):
+        keywords = list(
+            {
+                "".join(rng.choices(letters, k=rng.randint(3, 12)))
+                for _ in range(size)
+            }
+        )
+        misspelled = []
+        for keyword in rng.sample(keywords, queries):
+            i = rng.randrange(len(keyword))
+            misspelled.append(keyword[:i] + rng.choice(letters) + keyword[i:])
+        results = {}
+        for index_class in (DifflibIndex, NGramIndex):
+            index = build(index_class, keywords)
+            start = time.perf_counter()
+            results[index_class] = [index.search(q) for q in misspelled]
+            elapsed = time.perf_counter() - start
+            print(
+                f"{size:>5} keywords {index_class.__name__:>12}: "
+                f"{elapsed / queries * 1e6:9.1f} us/query"
+            )
+        agreement = sum(
+            a == b for a, b in zip(results[DifflibIndex], results[NGramIndex])
+        )
+        print(f"      same results for {agreement}/{queries} queries")
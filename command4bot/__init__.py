@@ -1,15 +1,24 @@
-from .command import BaseCommandRegistry, Command, CommandRegistry
+from .cache import LRUCache
+from .command import BaseCommandRegistry, Command, CommandRegistry, LazyCommand
 from .context import Context, ContextRegistry
 from .fallback import FallbackRegistry
 from .manager import CommandsManager, Config
+from .similarity import BaseSimilarityIndex, DifflibIndex, NGramIndex
+from .sqlite import SQLiteCommandRegistry
 
 __all__ = [
     "Context",
     "ContextRegistry",
     "Command",
+    "LazyCommand",
     "BaseCommandRegistry",
     "CommandRegistry",
+    "SQLiteCommandRegistry",
     "FallbackRegistry",
     "Config",
     "CommandsManager",
+    "BaseSimilarityIndex",
+    "DifflibIndex",
+    "NGramIndex",
+    "LRUCache",
 ]
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """A thread-safe mapping which discards the least recently used items
+
+    :param maxsize:
+        Maximum number of items to keep, ``0`` to disable caching,
+        defaults to 128
+    :type maxsize: int, optional
+    :param ttl:
+        Seconds before a cached value expires,
+        defaults to ``None`` (never expires)
+    :type ttl: Optional[float], optional
+    """
+
+    maxsize: int
+    ttl: Optional[float]
+    hits: int
+    misses: int
+    generation: int
+    # key -> (value, expiry time or None)
+    _data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]"
+
+    def __init__(
+        self, maxsize: int = 128, ttl: Optional[float] = None
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get cached value and mark it as recently used
+
+        Hit and miss counters are updated.
+        """
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: int = None) -> None:
+        """Cache a value
+
+        :param generation:
+            If given, the value is discarded if the cache has been cleared
+            since :attr:`generation` was read, because the value may have
+            been computed from outdated state
+        :type generation: int, optional
+        """
+        if self.maxsize <= 0:
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Discard all cached values. Counters are kept."""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
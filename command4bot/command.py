@@ -1,19 +1,50 @@
-from collections import defaultdict
-from difflib import get_close_matches
+import re
+import threading
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from importlib import import_module
 from inspect import signature
+from itertools import chain, islice
 from textwrap import dedent
 from typing import (
+    TYPE_CHECKING,
     Any,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     Optional,
+    Pattern,
+    Sequence,
+    Set,
     Tuple,
     Union,
+    cast,
     overload,
 )
 
+from .cache import LRUCache
+from .pattern import PatternMatcher
+from .ratelimit import RateLimiter
+from .similarity import BaseSimilarityIndex, NGramIndex
+from .trie import KeywordTrie
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .context import Context
+
+
+def split_keyword(content: str) -> Tuple[str, str]:
+    """Split content into command name an payload
+
+    :param content: text input to split
+    :type content: str
+    :return: (command name, payload)
+    :rtype: Tuple[str, str]
+    """
+    split_st = content.split(" ", 1)
+    return (split_st[0], split_st[1] if len(split_st) == 2 else "")
+
 
 def calc_status_diff(
     before: Dict[str, bool], after: Dict[str, bool]
@@ -38,8 +69,21 @@ class Command:
     name: str
     keywords: Iterable[str]
     groups: Iterable[str]
-    contexts: Iterable[str]
-    parameters: Iterable[str]
+    contexts: List[str]
+    parameters: List[str]
+    prefix: bool
+    pattern: Optional[Pattern]
+    is_loaded: bool
+    payload_parameter: Optional[str]
+    context_objects: Sequence["Context"]
+    needs_checkout: bool
+    invoke: Callable[[str, Dict[str, Any], Sequence[Any]], Any]
+    # Invoker returning an awaitable, for handlers run elsewhere
+    ainvoke: Optional[Callable[[str, Dict[str, Any], Sequence[Any]], Any]]
+    rate_limiter: Optional[RateLimiter]
+    result_cache: Optional[LRUCache]
+    cache_kwargs: Sequence[str]
+    executor: Optional[str]
 
     def __init__(
         self,
@@ -49,6 +93,8 @@ class Command:
         parameter_ignore: Iterable[str],
         context_ignore: Iterable[str],
         payload_parameter: str,
+        prefix: bool = False,
+        pattern: Union[str, Pattern, None] = None,
     ) -> None:
         """Create a Command
 
@@ -70,65 +116,469 @@ class Command:
 
             See also :attr:`Config.command_context_ignore`
         :type context_ignore: Iterable[str]
-        :param payload_parameter: [description]
+        :param payload_parameter:
+            The parameter to receive the payload.
+
+            See also :attr:`Config.command_payload_parameter`
         :type payload_parameter: str
+        :param prefix:
+            Whether keywords match input starting with them without a
+            following space, e.g. ``"/r"`` matches ``"/r123"``.
+            Requires a command registry with ``trie=True``,
+            defaults to False
+        :type prefix: bool, optional
+        :param pattern:
+            Regular expression matching input with no keyword matched.
+            Named groups of the pattern are passed as parameters,
+            defaults to None
+        :type pattern: Union[str, Pattern, None], optional
         """
         self.command_func = command_func
         self.name = command_func.__name__
+        self._setup(
+            keywords,
+            groups,
+            parameter_ignore,
+            context_ignore,
+            payload_parameter,
+            prefix,
+            pattern,
+        )
+        self._introspect()
+
+    def _setup(
+        self,
+        keywords: Iterable[str],
+        groups: Iterable[str],
+        parameter_ignore: Iterable[str],
+        context_ignore: Iterable[str],
+        payload_parameter: str,
+        prefix: bool,
+        pattern: Union[str, Pattern, None],
+    ) -> None:
         self.keywords = keywords
         self.groups = groups
+        self.prefix = prefix
+        self.pattern = (
+            re.compile(pattern) if isinstance(pattern, str) else pattern
+        )
+        self.is_loaded = True
         self.parameters = []
         self.contexts = []
+        self.payload_parameter = None
+        self.context_objects = ()
+        self.needs_checkout = False
+        self.rate_limiter = None
+        self.result_cache = None
+        self.cache_kwargs = ()
+        self.executor = None
+        self.ainvoke = None
+        self._help: Optional[str] = None
+        self._parameter_ignore = parameter_ignore
+        self._context_ignore = [*context_ignore, payload_parameter]
+        if self.pattern is not None:
+            # Named groups are passed like keyword arguments of ``exec``
+            self._context_ignore.extend(self.pattern.groupindex)
+        self._payload_parameter = payload_parameter
+
+    def _introspect(self) -> None:
+        for parameter in signature(self.command_func).parameters:
+            if parameter not in self._parameter_ignore:
+                self.parameters.append(parameter)
+                if parameter not in self._context_ignore:
+                    self.contexts.append(parameter)
 
-        if command_func.__doc__ is None:
-            self.help = "/".join(self.keywords) + " " + command_func.__name__
-        else:
-            self.help = dedent(command_func.__doc__).strip()
-        self.brief_help = "- " + self.help.split("\n", 1)[0]
+        if self._payload_parameter in self.parameters:
+            self.payload_parameter = self._payload_parameter
+        self.invoke = self._compile_invoker()
+        self._parameter_set = frozenset(self.parameters)
+
+    @property
+    def help(self) -> str:
+        """Full help string, from the docstring of the handler"""
+        if self._help is None:
+            doc = self.command_func.__doc__
+            if doc is None:
+                # Commands without keywords have a pattern
+                usage = self.keywords or [cast(Pattern, self.pattern).pattern]
+                self._help = "/".join(usage) + " " + self.name
+            else:
+                self._help = dedent(doc).strip()
+        return self._help
+
+    @property
+    def brief_help(self) -> str:
+        """The first line of :attr:`help`, prefixed with ``"- "``"""
+        return "- " + self.help.split("\n", 1)[0]
+
+    def _compile_invoker(
+        self,
+    ) -> Callable[[str, Dict[str, Any], Sequence[Any]], Any]:
+        """Build a function calling the handler with exactly what it needs.
 
-        context_ignore = [*context_ignore, payload_parameter]
+        The returned invoker takes the payload, the extra keyword arguments
+        passed to :meth:`CommandsManager.exec` and the values of
+        :attr:`contexts` in the same order.
+        """
+        func = self.command_func
+        context_names = tuple(self.contexts)
+        payload_name = self.payload_parameter
+        extra_names = tuple(
+            parameter
+            for parameter in self.parameters
+            if parameter not in self.contexts and parameter != payload_name
+        )
 
-        for parameter in signature(command_func).parameters:
-            if parameter not in parameter_ignore:
-                self.parameters.append(parameter)
-                if parameter not in context_ignore:
-                    self.contexts.append(parameter)
+        if not context_names and not extra_names:
+            if payload_name is None:
+                return lambda payload, kwargs, context_values: func()
+            return lambda payload, kwargs, context_values: func(
+                **{payload_name: payload}
+            )
+
+        def invoke(
+            payload: str, kwargs: Dict[str, Any], context_values: Sequence[Any]
+        ) -> Any:
+            args = dict(zip(context_names, context_values))
+            if payload_name is not None:
+                args[payload_name] = payload
+            for name in extra_names:
+                if name in kwargs:
+                    args[name] = kwargs[name]
+            return func(**args)
+
+        return invoke
+
+    def bind_contexts(self, context_objects: Sequence["Context"]) -> None:
+        """Bind context objects in the same order of :attr:`contexts`
+
+        :param context_objects: contexts the command depends on
+        :type context_objects: Sequence[Context]
+        """
+        self.context_objects = context_objects
+        # Values of non-shared contexts must be acquired and released
+        self.needs_checkout = any(
+            context.scope != "shared" for context in context_objects
+        )
+
+    def cache_key(self, payload: str, kwargs: Dict[str, Any]) -> Tuple:
+        """Key of the call in :attr:`result_cache`
+
+        :return: ``payload`` and values of :attr:`cache_kwargs`
+        :rtype: Tuple
+        """
+        return (payload, *[kwargs.get(name) for name in self.cache_kwargs])
 
     def __call__(self, **kwargs: Any) -> Any:
         return self.command_func(
-            **{k: v for k, v in kwargs.items() if k in self.parameters},
+            **{k: v for k, v in kwargs.items() if k in self._parameter_set},
+        )
+
+
+class LazyCommand(Command):
+    """A command whose handler is imported on first use
+
+    Until :meth:`load` is called, :attr:`contexts` and :attr:`parameters`
+    are empty, and the handler module is not imported unless
+    :attr:`command_func` or :attr:`help` is accessed.
+    """
+
+    import_path: str
+
+    def __init__(
+        self,
+        import_path: str,
+        keywords: Iterable[str],
+        groups: Iterable[str],
+        parameter_ignore: Iterable[str],
+        context_ignore: Iterable[str],
+        payload_parameter: str,
+        prefix: bool = False,
+        help: Optional[str] = None,
+        pattern: Union[str, Pattern, None] = None,
+    ) -> None:
+        """Create a LazyCommand
+
+        :param import_path:
+            Where to import the handler, like ``"package.module:function"``
+        :type import_path: str
+        :param help:
+            Help string, to avoid importing the handler just for help,
+            defaults to the docstring of the handler
+        :type help: Optional[str], optional
+        :raises ValueError: If ``import_path`` is malformed
+
+        For other parameters, see :class:`Command`.
+        """
+        module_name, _, qualname = import_path.partition(":")
+        if not module_name or not qualname:
+            raise ValueError(
+                f'Import path "{import_path}" should look like '
+                '"package.module:function"'
+            )
+        self.import_path = import_path
+        self.name = qualname.rsplit(".", 1)[-1]
+        self._command_func: Optional[Callable] = None
+        self._setup(
+            keywords,
+            groups,
+            parameter_ignore,
+            context_ignore,
+            payload_parameter,
+            prefix,
+            pattern,
         )
+        self._help = help
+        self.is_loaded = False
+        self._introspected = False
+
+    @property  # type: ignore
+    def command_func(self) -> Callable:  # type: ignore
+        if self._command_func is None:
+            module_name, _, qualname = self.import_path.partition(":")
+            command_func: Any = import_module(module_name)
+            for attr in qualname.split("."):
+                command_func = getattr(command_func, attr)
+            self._command_func = command_func
+        return self._command_func
+
+    def load(self) -> None:
+        """Import the handler and inspect its parameters
+
+        :attr:`is_loaded` is left for the manager to set after binding
+        the contexts.
+        """
+        if not self._introspected:
+            self._introspect()
+            self._introspected = True
 
 
 class BaseCommandRegistry:
     _reg: Dict[str, Command]
     _groups: defaultdict
+    _closed_count: Dict[str, int]
+    _group_parents: Dict[str, List[str]]
+    _command_names: Dict[str, Set[str]]
+    _similarity_index: BaseSimilarityIndex
+    _trie: Optional[KeywordTrie]
+    _patterns: PatternMatcher
 
-    def __init__(self):
+    def __init__(
+        self, similarity_index: BaseSimilarityIndex = None, trie: bool = False
+    ):
+        """
+        :param similarity_index:
+            Index to find similar keywords for misspelled input,
+            defaults to :class:`NGramIndex`
+        :type similarity_index: BaseSimilarityIndex, optional
+        :param trie:
+            Match keywords with a :class:`KeywordTrie`, enabling multi-word
+            keywords like ``"admin ban"`` and prefix keywords,
+            defaults to False
+        :type trie: bool, optional
+        """
         self._reg = {}
+        self._similarity_index = similarity_index or NGramIndex()
+        self._trie = KeywordTrie() if trie else None
+        self._patterns = PatternMatcher()
         self._groups = defaultdict(list)
+        # Number of closed names among a command's name, its groups and
+        # their ancestor groups, kept up to date by ``open`` and ``close``
+        self._closed_count = {}
+        # group name -> parent group names
+        self._group_parents = {}
+        # command name -> names whose status affect the command
+        self._command_names = {}
 
     def register(self, command: Command) -> None:
+        if command.prefix and self._trie is None:
+            raise ValueError(
+                f'Cannot register prefix command "{command.name}" '
+                "because the registry is created without trie=True"
+            )
         for keyword in command.keywords:
             if keyword in self._reg:
                 raise ValueError(f'Duplicated command keyword: "{keyword}"')
             self._reg[keyword] = command
-
-        if command.name in self._groups or command.name in command.groups:
+            self._similarity_index.add(keyword)
+            if self._trie is not None:
+                self._trie.insert(keyword, command, prefix=command.prefix)
+
+        if (
+            command.name in self._groups
+            or command.name in self._group_parents
+            or command.name in command.groups
+        ):
             raise ValueError(f'Duplicated command name: "{command.name}"')
-        self._groups[command.name] = [command]
-
-        for group_name in command.groups:
+        if command.pattern is not None:
+            self._patterns.insert(command.pattern, command)
+        names = self._names_of(command)
+        self._command_names[command.name] = set(names)
+        for name in names:
             # No need to check duplication here!
-            self._groups[group_name].append(command)
+            self._groups[name].append(command)
+
+        self._closed_count[command.name] = self._count_closed(command)
+
+    def _ancestors(self, group: str) -> List[str]:
+        """Parent groups of ``group``, and their parents, recursively"""
+        ancestors: Dict[str, None] = {}
+        stack = list(self._group_parents.get(group, ()))
+        while stack:
+            parent = stack.pop()
+            if parent not in ancestors:
+                ancestors[parent] = None
+                stack.extend(self._group_parents.get(parent, ()))
+        return list(ancestors)
+
+    def _names_of(self, command: Command) -> List[str]:
+        """Names whose status affect ``command``"""
+        return list(
+            dict.fromkeys(
+                [
+                    command.name,
+                    *command.groups,
+                    *chain.from_iterable(
+                        self._ancestors(group) for group in command.groups
+                    ),
+                ]
+            )
+        )
+
+    def _count_closed(self, command: Command) -> int:
+        return sum(
+            not self.get_status(name) for name in self._names_of(command)
+        )
+
+    def add_group(self, name: str, parents: Iterable[str]) -> List[Command]:
+        """Make group ``name`` a subgroup of ``parents``
+
+        Commands of the group, including those of its subgroups, are
+        closed when any of the parent groups, or their parents, is closed.
+        Groups can be added before or after registering their commands.
+
+        :param name: The name of the group
+        :type name: str
+        :param parents: Names of the parent groups
+        :type parents: Iterable[str]
+        :raises ValueError: If ``name`` or a parent is a command name,
+            or the groups become circular
+        :return: Commands which become closed because of closed parents
+        :rtype: List[Command]
+        """
+        if name in self._closed_count:
+            raise ValueError(f'Cannot add command "{name}" as a group')
+        existing = self._group_parents.get(name, [])
+        parents = [
+            parent
+            for parent in dict.fromkeys(parents)
+            if parent not in existing
+        ]
+        for parent in parents:
+            if parent in self._closed_count:
+                raise ValueError(
+                    f'Command "{parent}" cannot be a parent group'
+                )
+            if parent == name or name in self._ancestors(parent):
+                raise ValueError(f'Circular parent groups of "{name}"')
+        self._group_parents[name] = existing + parents
+
+        new_ancestors = list(
+            dict.fromkeys(
+                [
+                    *parents,
+                    *chain.from_iterable(
+                        self._ancestors(parent) for parent in parents
+                    ),
+                ]
+            )
+        )
+        commands_closed = []
+        for command in self._groups.get(name, ()):
+            names = self._command_names[command.name]
+            added = [
+                ancestor for ancestor in new_ancestors if ancestor not in names
+            ]
+            names.update(added)
+            for ancestor in added:
+                self._groups[ancestor].append(command)
+            closed = sum(not self.get_status(ancestor) for ancestor in added)
+            if closed:
+                before = self._closed_count[command.name]
+                self._closed_count[command.name] = before + closed
+                if not before:
+                    commands_closed.append(command)
+        return commands_closed
+
+    @property
+    def use_trie(self) -> bool:
+        """Whether keywords are matched with :class:`KeywordTrie`"""
+        return self._trie is not None
 
     def get(self, keyword: str) -> Optional[Command]:
         return self._reg.get(keyword)
 
+    def match(
+        self, content: str, case_sensitive: bool = True
+    ) -> Tuple[Optional[Command], str]:
+        """Find the command for text input and split out the payload
+
+        Without trie, the keyword is the first word of ``content``.
+        With trie, the longest matching keyword is used.
+
+        :param content: text input
+        :type content: str
+        :param case_sensitive: Whether to match case sensitively
+        :type case_sensitive: bool, optional
+        :return: (command or ``None``, payload)
+        :rtype: Tuple[Optional[Command], str]
+        """
+        if self._trie is None:
+            keyword, payload = split_keyword(content)
+            if not case_sensitive:
+                keyword = keyword.lower()
+            return self._reg.get(keyword), payload
+        match = self._trie.longest_match(content, case_sensitive)
+        if match is None:
+            return None, split_keyword(content)[1]
+        command, end = match
+        if content[end : end + 1] == " ":
+            end += 1
+        return command, content[end:]
+
+    @property
+    def has_patterns(self) -> bool:
+        """Whether any command is registered with a pattern"""
+        return bool(self._patterns)
+
+    def match_pattern(
+        self, content: str, case_sensitive: bool = True
+    ) -> Tuple[Optional[Command], Dict[str, str]]:
+        """Find the command whose pattern matches text input
+
+        All patterns are merged into one regular expression, so the input
+        is searched once however many pattern commands there are. If
+        several patterns match, the one matching earliest in the input
+        wins, then the one registered first.
+
+        :param content: text input
+        :type content: str
+        :param case_sensitive: Whether to match case sensitively
+        :type case_sensitive: bool, optional
+        :return: (command or ``None``, values of named groups)
+        :rtype: Tuple[Optional[Command], Dict[str, str]]
+        """
+        if not self._patterns:
+            return None, {}
+        match = self._patterns.search(content, case_sensitive)
+        if match is None:
+            return None, {}
+        return match
+
     def get_similar_commands(self, keyword: str) -> List[Command]:
         return [
             self._reg[match]
-            for match in get_close_matches(keyword, self._reg.keys())
+            for match in self._similarity_index.search(keyword)
             if self.resolve_command_status(self._reg[match])
         ]
 
@@ -154,7 +604,7 @@ class BaseCommandRegistry:
     ) -> Optional[Callable]:
         for arg in args:
             name = arg.__name__ if callable(arg) else arg
-            if self.get(name):
+            if self.get(name) or self._groups.get(name):
                 raise ValueError(
                     f"Cannot mark {name} as default closed because "
                     "the command already registered"
@@ -172,61 +622,190 @@ class BaseCommandRegistry:
         :return: Status, ``True`` for open and ``False`` for closed
         :rtype: bool
         """
-        if not self.get_status(command.name):
-            return False
-        return all(
-            self.get_status(group_name) for group_name in command.groups
-        )
+        closed_count = self._closed_count.get(command.name)
+        if closed_count is None:  # not registered here
+            closed_count = self._count_closed(command)
+        return closed_count == 0
 
     def open(self, name: str) -> Iterable[Command]:
-        commands_opened = [
-            command
-            for command in self._groups[name]
-            if all(
-                self.get_status(group_name)
-                for group_name in [command.name, *command.groups]
-                if group_name != name
-            )
-        ]
+        """Open a command or group
+
+        :param name: The name of the command or group to open
+        :type name: str
+        :return: Commands which become open
+        :rtype: Iterable[Command]
+        """
+        if self.get_status(name):
+            return []
         self.set_status(name, True)
+        commands_opened = []
+        for command in self._groups.get(name, ()):
+            self._closed_count[command.name] -= 1
+            if self._closed_count[command.name] == 0:
+                commands_opened.append(command)
         return commands_opened
 
     def close(self, name: str) -> Iterable[Command]:
-        commands_closed = [
-            command
-            for command in self._groups[name]
-            if self.resolve_command_status(command)
-        ]
+        """Close a command or group
+
+        :param name: The name of the command or group to close
+        :type name: str
+        :return: Commands which become closed
+        :rtype: Iterable[Command]
+        """
+        if not self.get_status(name):
+            return []
         self.set_status(name, False)
+        commands_closed = []
+        for command in self._groups.get(name, ()):
+            self._closed_count[command.name] += 1
+            if self._closed_count[command.name] == 1:
+                commands_closed.append(command)
         return commands_closed
 
     def batch_update_status(
         self, status_diff: Dict[str, bool]
     ) -> Tuple[List[Command], List[Command]]:
-        to_close = [k for k, v in status_diff.items() if not v]
-        to_open = [k for k, v in status_diff.items() if v]
+        """Open and close many commands and groups at once
+
+        The closed counter of each affected command is updated once with
+        the net change, so a command in several updated groups is checked
+        only once and returned at most once.
+
+        :param status_diff: Names to open (``True``) or close (``False``)
+        :type status_diff: Dict[str, bool]
+        :return: Commands which become closed, and which become open
+        :rtype: Tuple[List[Command], List[Command]]
+        """
+        closing: List[Iterable[Command]] = []
+        opening: List[Iterable[Command]] = []
+        for name, status in status_diff.items():
+            if self.get_status(name) == status:
+                continue
+            self.set_status(name, status)
+            (opening if status else closing).append(self._groups.get(name, ()))
+        # How many times each command is closed and opened, counted in C
+        closes = Counter(chain.from_iterable(closing))
+        opens = Counter(chain.from_iterable(opening))
+
+        closed_count = self._closed_count
         commands_closed: List[Command] = []
         commands_opened: List[Command] = []
-        for name in to_close:
-            commands_closed.extend(self.close(name))
-        for name in to_open:
-            commands_opened.extend(self.open(name))
+        pop_opens = opens.pop
+        for command, delta in closes.items():
+            if opens:
+                delta -= pop_opens(command, 0)
+                if not delta:
+                    continue
+            name = command.name
+            before = closed_count[name]
+            closed_count[name] = before + delta
+            if not before:
+                commands_closed.append(command)
+            elif before + delta == 0:
+                commands_opened.append(command)
+        for command, count in opens.items():
+            after = closed_count[command.name] = (
+                closed_count[command.name] - count
+            )
+            if not after:
+                commands_opened.append(command)
         return commands_closed, commands_opened
 
+    def pull_status_diff(self) -> Dict[str, bool]:
+        """Status changes made elsewhere and not applied here yet
+
+        For registries whose status is shared, e.g. by other processes.
+        The changes should be applied with :meth:`batch_update_status`
+        inside :meth:`applying_pulled`.
+
+        :return: Status diff, empty by default
+        :rtype: Dict[str, bool]
+        """
+        return {}
+
+    @contextmanager
+    def applying_pulled(self) -> Iterator[None]:
+        """Within this context, status changes are not shared again"""
+        yield
+
 
 class CommandRegistry(BaseCommandRegistry):
-    def __init__(self):
-        super().__init__()
+    """Command registry keeping status in a dict
+
+    Every status change is recorded in a journal with a monotonically
+    increasing :attr:`version`, so that followers, like other processes
+    mirroring this registry, can fetch only the changes since the version
+    they have seen with :meth:`changes_since`.
+
+    :param journal_size:
+        Number of the latest changes to keep, defaults to 10000
+
+    For other parameters, see :class:`BaseCommandRegistry`.
+    """
+
+    version: int
+    _status: Dict[str, bool]
+    _journal: "deque[Tuple[str, bool]]"
+
+    def __init__(
+        self,
+        similarity_index: BaseSimilarityIndex = None,
+        trie: bool = False,
+        journal_size: int = 10000,
+    ):
+        super().__init__(similarity_index, trie)
         self._status = {}
+        self.version = 0
+        self._journal = deque(maxlen=journal_size)
+        self._journal_lock = threading.Lock()
 
     def get_status(self, name: str) -> bool:
         return self._status.get(name, True)
 
     def set_status(self, name: str, status: bool) -> None:
         self._status[name] = status
+        with self._journal_lock:
+            self.version += 1
+            self._journal.append((name, status))
 
     def set_default_closed(self, name: str) -> None:
         self._status[name] = False
 
     def calc_status_diff(self, new_status: Dict[str, bool]) -> Dict[str, bool]:
         return calc_status_diff(self._status, new_status)
+
+    def changes_since(
+        self, version: int
+    ) -> Tuple[int, Optional[Dict[str, bool]]]:
+        """Net status changes after ``version``
+
+        The cost is proportional to the number of changes, and checking
+        without changes is O(1). Apply the changes with
+        :meth:`CommandsManager.batch_update_status`.
+
+        :param version: The version seen last time, ``0`` for the start
+        :type version: int
+        :return: The current version, and the changes or ``None`` if the
+            changes are no longer in the journal, in which case the whole
+            status should be synced, see :meth:`status_snapshot`
+        :rtype: Tuple[int, Optional[Dict[str, bool]]]
+        """
+        with self._journal_lock:
+            current = self.version
+            behind = current - version
+            if behind == 0:
+                return current, {}
+            if behind < 0 or behind > len(self._journal):
+                return current, None
+            changes = list(islice(reversed(self._journal), behind))
+        # Later changes of the same name win
+        return current, dict(reversed(changes))
+
+    def status_snapshot(self) -> Tuple[int, Dict[str, bool]]:
+        """The current version and a copy of the whole status
+
+        Names which have always been open are not included.
+        """
+        with self._journal_lock:
+            return self.version, dict(self._status)
@@ -1,69 +1,595 @@
+import asyncio
 import threading
-from inspect import isgenerator
-from typing import Any, Callable, Dict, Generator, Optional
+import time
+from inspect import Parameter, isasyncgen, isawaitable, isgenerator, signature
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 from .command import Command
+from .metrics import Metrics
 from .typing_ext import F
 
 
+def _finalize_async_generator(agen: AsyncGenerator) -> None:
+    """Run the cleanup part of an async generator context.
+
+    If called inside a running event loop, the cleanup is scheduled as a task
+    on that loop. Otherwise a temporary event loop is used to run it.
+    """
+
+    async def finalize() -> None:
+        try:
+            await agen.__anext__()
+        except StopAsyncIteration:
+            pass
+
+    # ``asyncio.get_running_loop`` is not available in Python 3.6
+    loop = asyncio._get_running_loop()
+    if loop is not None:
+        loop.create_task(finalize())
+        return
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(finalize())
+    finally:
+        loop.close()
+
+
+def _finalize_generator(
+    generator: Optional[Union[Generator, AsyncGenerator]]
+) -> None:
+    """Run the cleanup part of a generator context, if any."""
+    if isasyncgen(generator):
+        _finalize_async_generator(generator)  # type: ignore
+    elif generator is not None:
+        try:
+            next(generator)  # type: ignore
+        except StopIteration:
+            pass
+
+
+REFRESH_MODES = ("sync", "background")
+SCOPES = ("shared", "thread", "pool")
+# Expiry time of invalidated values, whose listeners are already notified
+INVALIDATED = float("-inf")
+
+
 class Context:
     name: str
     context_func: Callable
     enable_cache: bool
-    is_cached: bool
-    cached_value: Any
-    cached_generator: Optional[Generator]
+    ttl: Optional[float]
+    refresh: str
+    scope: str
+    size: Optional[int]
+    cached_generator: Optional[Union[Generator, AsyncGenerator]]
+    cached_at: float
     reference_count: int
+    dependencies: List[str]
+    dependency_objects: Optional[List["Context"]]
+    metrics: Optional[Metrics] = None
+    listeners: List[Callable[[], None]]
+
+    def __init__(
+        self,
+        context_func: F,
+        enable_cache: bool = True,
+        ttl: Optional[float] = None,
+        refresh: str = "sync",
+        scope: str = "shared",
+        size: Optional[int] = None,
+    ) -> None:
+        """Create a Context
 
-    def __init__(self, context_func: F, enable_cache: bool = True) -> None:
+        :param context_func: Function returning or yielding the value
+        :type context_func: F
+        :param enable_cache: Whether to cache the value, defaults to True
+        :type enable_cache: bool, optional
+        :param ttl:
+            Seconds before the cached value expires,
+            defaults to ``None`` (never expires)
+        :type ttl: Optional[float], optional
+        :param refresh:
+            How to refresh expired values. ``"sync"`` creates the new
+            value on read, while ``"background"`` keeps returning the stale
+            value while a background thread creates the new one,
+            defaults to ``"sync"``
+        :type refresh: str, optional
+        :param scope:
+            Who shares a value. ``"shared"`` for all calls, ``"thread"`` for
+            calls on the same thread, and ``"pool"`` for a pool of ``size``
+            values, each checked out by one command call at a time,
+            defaults to ``"shared"``
+        :type scope: str, optional
+        :param size: Pool size for ``scope="pool"``
+        :type size: Optional[int], optional
+        :raises ValueError: If the options are unknown or conflicting
+        """
+        if refresh not in REFRESH_MODES:
+            raise ValueError(
+                f'Unknown refresh mode "{refresh}", '
+                f"should be one of {REFRESH_MODES}"
+            )
+        if scope not in SCOPES:
+            raise ValueError(
+                f'Unknown context scope "{scope}", should be one of {SCOPES}'
+            )
+        if scope != "shared" and (ttl is not None or not enable_cache):
+            raise ValueError(
+                f'Context scope "{scope}" does not support ttl '
+                "or disabling cache"
+            )
+        if scope == "pool" and (size is None or size < 1):
+            raise ValueError("Pool size should be a positive integer")
         self.name = context_func.__name__
         # python/mypy#2427
         self.context_func = context_func  # type: ignore
         self.enable_cache = enable_cache
+        self.ttl = ttl
+        self.refresh = refresh
+        self.scope = scope
+        self.size = size
+        # Parameters of the context function are other contexts
+        self.dependencies = [
+            parameter.name
+            for parameter in signature(context_func).parameters.values()
+            if parameter.kind
+            not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)
+        ]
+        # Bound by ContextRegistry
+        self.dependency_objects = None
 
-        self.is_cached = False
-        self.cached_value = None
+        # (value, expiry time or None) if cached, read without the lock
+        self.__slot: Optional[Tuple[Any, Optional[float]]] = None
         self.cached_generator = None
+        self.cached_at = 0.0
         self.reference_count = 0
+        self.listeners = []
         self.__lock = threading.Lock()
+        # Created lazily so that it binds to the running event loop, and
+        # created again for another event loop
+        self.__async_lock: Optional[asyncio.Lock] = None
+        self.__async_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__refreshing = False
+        # Increased on cleanup, to drop values refreshed for an old cache
+        self.__epoch = 0
+        # For scope="thread", (value, generator) of every thread
+        self.__local = threading.local()
+        self.__thread_items: List[Tuple[Any, Optional[Generator]]] = []
+        # For scope="pool", (value, generator, epoch) of checked out items
+        self.__pool_cond = threading.Condition(self.__lock)
+        self.__pool_idle: List[Tuple[Any, Optional[Generator]]] = []
+        self.__pool_busy: List[Tuple[Any, Optional[Generator], int]] = []
+        self.__pool_created = 0
+        # Calls in flight, during which cleanup is deferred
+        self.__in_use = 0
+        self.__cleanup_deferred = False
+
+    @property
+    def is_cached(self) -> bool:
+        return self.__slot is not None
+
+    @property
+    def cached_value(self) -> Any:
+        slot = self.__slot
+        return None if slot is None else slot[0]
+
+    def _is_expired(self) -> bool:
+        slot = self.__slot
+        return (
+            slot is not None
+            and slot[1] is not None
+            and time.monotonic() >= slot[1]
+        )
+
+    def _create(self) -> Tuple[Any, Optional[Generator]]:
+        if self.metrics is None:
+            return self._create_value()
+        start = time.perf_counter()
+        try:
+            return self._create_value()
+        finally:
+            self.metrics.observe_context_init(
+                self.name, time.perf_counter() - start
+            )
+
+    def _create_value(self) -> Tuple[Any, Optional[Generator]]:
+        result = self.context_func(
+            **{
+                dependency.name: dependency.value
+                for dependency in self.dependency_objects or ()
+            }
+        )
+
+        if isawaitable(result) or isasyncgen(result):
+            if hasattr(result, "close"):
+                result.close()  # avoid "never awaited" warnings
+            raise TypeError(
+                f'Context "{self.name}" is asynchronous, '
+                "use CommandsManager.aexec instead"
+            )
+
+        if isgenerator(result):
+            return next(result), result
+        return result, None
+
+    async def _acreate(
+        self,
+    ) -> Tuple[Any, Optional[Union[Generator, AsyncGenerator]]]:
+        if self.metrics is None:
+            return await self._acreate_value()
+        start = time.perf_counter()
+        try:
+            return await self._acreate_value()
+        finally:
+            self.metrics.observe_context_init(
+                self.name, time.perf_counter() - start
+            )
+
+    async def _acreate_value(
+        self,
+    ) -> Tuple[Any, Optional[Union[Generator, AsyncGenerator]]]:
+        result = self.context_func(
+            **{
+                dependency.name: await dependency.avalue()
+                for dependency in self.dependency_objects or ()
+            }
+        )
+
+        if isawaitable(result):
+            result = await result
+
+        if isasyncgen(result):
+            return await result.__anext__(), result
+        if isgenerator(result):
+            return next(result), result
+        return result, None
+
+    def _store(
+        self,
+        value: Any,
+        generator: Optional[Union[Generator, AsyncGenerator]],
+    ) -> None:
+        self.cached_generator = generator
+        self.cached_at = time.monotonic()
+        expires_at = None if self.ttl is None else self.cached_at + self.ttl
+        slot = self.__slot
+        replaced = slot is not None and slot[1] != INVALIDATED
+        # Publish the value last, for readers without the lock
+        self.__slot = (value, expires_at)
+        if replaced:
+            self._notify()
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """Call ``listener`` whenever the value is discarded
+
+        That is, when the cached value is invalidated, replaced on refresh,
+        or cleaned up. Expiry by :attr:`ttl` is noticed on the next read.
+        """
+        self.listeners.append(listener)
+
+    def _notify(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+    def _drop(self) -> Optional[Union[Generator, AsyncGenerator]]:
+        slot, self.__slot = self.__slot, None
+        generator = self.cached_generator
+        self.cached_generator = None
+        self.__epoch += 1
+        if slot is not None and slot[1] != INVALIDATED:
+            self._notify()
+        return generator
+
+    def _start_refresh(self) -> None:
+        """Refresh in a background thread. Must be called with the lock."""
+        if self.__refreshing:
+            return
+        self.__refreshing = True
+        threading.Thread(
+            target=self._refresh, args=(self.__epoch,), daemon=True
+        ).start()
+
+    def _refresh(self, epoch: int) -> None:
+        try:
+            value, generator = self._create()
+        except Exception:
+            # Keep serving the stale value, retry on next expired read
+            with self.__lock:
+                self.__refreshing = False
+            raise
+        old_generator: Optional[Union[Generator, AsyncGenerator]]
+        with self.__lock:
+            self.__refreshing = False
+            if epoch != self.__epoch:  # cleaned up meanwhile
+                old_generator = generator
+            else:
+                old_generator = self.cached_generator
+                self._store(value, generator)
+        _finalize_generator(old_generator)
+
+    async def _arefresh(self, epoch: int) -> None:
+        try:
+            value, generator = await self._acreate()
+        finally:
+            self.__refreshing = False
+        if epoch != self.__epoch:
+            _finalize_generator(generator)
+            return
+        old_generator = self.cached_generator
+        self._store(value, generator)
+        _finalize_generator(old_generator)
 
     @property
     def value(self) -> Any:
+        # Fast path without the lock once cached. Reading the slot is atomic,
+        # so the value and its expiry time are always consistent.
+        slot = self.__slot
+        if slot is not None and (
+            slot[1] is None or time.monotonic() < slot[1]
+        ):
+            return slot[0]
         with self.__lock:
             if self.is_cached:
-                return self.cached_value
+                if not self._is_expired():
+                    return self.cached_value
+                if self.refresh == "background":
+                    self._start_refresh()
+                    return self.cached_value
+                _finalize_generator(self._drop())
+
+            value, generator = self._create()
+
+            if self.enable_cache:
+                self._store(value, generator)
+
+            return value
+
+    async def avalue(self) -> Any:
+        """Asynchronous version of :attr:`value`.
 
-            result = self.context_func()
+        Supports ``async def`` context functions and async generator context
+        functions as well as synchronous ones.
+        """
+        slot = self.__slot
+        if slot is not None and (
+            slot[1] is None or time.monotonic() < slot[1]
+        ):
+            return slot[0]
+        loop = asyncio.get_event_loop()
+        if self.__async_lock is None or self.__async_lock_loop is not loop:
+            self.__async_lock = asyncio.Lock()
+            self.__async_lock_loop = loop
+        async with self.__async_lock:
+            if self.is_cached:
+                if not self._is_expired():
+                    return self.cached_value
+                if self.refresh == "background":
+                    if not self.__refreshing:
+                        self.__refreshing = True
+                        asyncio.ensure_future(self._arefresh(self.__epoch))
+                    return self.cached_value
+                _finalize_generator(self._drop())
 
-            if isgenerator(result):
-                if self.enable_cache:
-                    self.cached_generator = result
-                result = next(result)
+            value, generator = await self._acreate()
 
             if self.enable_cache:
-                self.is_cached = True
-                self.cached_value = result
+                self._store(value, generator)
+
+            return value
+
+    def acquire(self) -> Any:
+        """Get the value for one command call
+
+        Every call must be paired with :meth:`release`, because values of
+        ``scope="pool"`` are checked out until released.
+        """
+        if self.scope == "shared":
+            return self.value
+        if self.scope == "thread":
+            return self._acquire_thread_value()
+        return self._acquire_pool_value()
+
+    async def aacquire(self) -> Any:
+        """Asynchronous version of :meth:`acquire`
+
+        Waiting for a pooled value happens in the default executor,
+        so that the event loop is not blocked.
+        """
+        if self.scope == "shared":
+            return await self.avalue()
+        if self.scope == "thread":
+            return self._acquire_thread_value()
+        return await asyncio.get_event_loop().run_in_executor(
+            None, self._acquire_pool_value
+        )
 
-            return result
+    def release(self, value: Any) -> None:
+        """Return a value got from :meth:`acquire`"""
+        if self.scope == "pool":
+            self._release_pool_value(value)
+
+    def _acquire_thread_value(self) -> Any:
+        item = getattr(self.__local, "item", None)
+        if item is not None:
+            return item[0]
+        item = self._create()
+        with self.__lock:
+            self.__thread_items.append(item)
+            local = self.__local
+        local.item = item
+        return item[0]
+
+    def _acquire_pool_value(self) -> Any:
+        # Checked to be a positive integer on creation for scope="pool"
+        size = cast(int, self.size)
+        with self.__pool_cond:
+            while not self.__pool_idle and self.__pool_created >= size:
+                self.__pool_cond.wait()
+            epoch = self.__epoch
+            if self.__pool_idle:
+                value, generator = self.__pool_idle.pop()
+                self.__pool_busy.append((value, generator, epoch))
+                return value
+            self.__pool_created += 1
+        try:
+            value, generator = self._create()
+        except BaseException:
+            with self.__pool_cond:
+                self.__pool_created -= 1
+                self.__pool_cond.notify()
+            raise
+        with self.__pool_cond:
+            self.__pool_busy.append((value, generator, epoch))
+        return value
+
+    def _release_pool_value(self, value: Any) -> None:
+        with self.__pool_cond:
+            for i, (busy_value, generator, epoch) in enumerate(
+                self.__pool_busy
+            ):
+                if busy_value is value:
+                    break
+            else:
+                raise ValueError(
+                    f'Value not acquired from context "{self.name}"'
+                )
+            del self.__pool_busy[i]
+            self.__pool_cond.notify()
+            if epoch == self.__epoch:
+                self.__pool_idle.append((value, generator))
+                return
+            # cleaned up while checked out
+            self.__pool_created -= 1
+        _finalize_generator(generator)
+
+    def retain(self) -> None:
+        """Mark the context as in use by a call in flight
+
+        Until the matching :meth:`unretain`, :meth:`cleanup` is deferred.
+        Dependencies are retained as well.
+        """
+        with self.__lock:
+            self.__in_use += 1
+        for dependency in self.dependency_objects or ():
+            dependency.retain()
+
+    def unretain(self) -> None:
+        """Undo :meth:`retain`, running the deferred cleanup if any
+
+        The deferred cleanup is skipped if the context has been referenced
+        again meanwhile.
+        """
+        with self.__lock:
+            self.__in_use -= 1
+            cleanup = not self.__in_use and self.__cleanup_deferred
+            if cleanup:
+                self.__cleanup_deferred = False
+        try:
+            if cleanup and self.reference_count == 0:
+                self.cleanup()
+        finally:
+            # Dependencies outlive the contexts depending on them
+            for dependency in self.dependency_objects or ():
+                dependency.unretain()
+
+    def invalidate(self) -> None:
+        """Mark the cached value as expired.
+
+        The value is refreshed the same way as when :attr:`ttl` passes.
+        With ``refresh="background"``, the refresh starts immediately.
+        """
+        with self.__lock:
+            slot = self.__slot
+            if slot is None:
+                return
+            self.__slot = (slot[0], INVALIDATED)
+            self._notify()
+            if self.refresh == "background":
+                if asyncio._get_running_loop() is None:
+                    self._start_refresh()
+                elif not self.__refreshing:
+                    self.__refreshing = True
+                    asyncio.ensure_future(self._arefresh(self.__epoch))
 
     def cleanup(self) -> None:
+        """Clean up cached value and run the rest of the generator.
+
+        Cleanup of async generator contexts is scheduled on the running event
+        loop if there is one, otherwise it is run to completion.
+
+        If the context is retained by calls in flight, the cleanup is
+        deferred until the last one finishes.
+        """
         with self.__lock:
-            if self.is_cached:
-                if self.cached_generator is not None:
-                    try:
-                        next(self.cached_generator)
-                    except StopIteration:
-                        pass
-                    self.cached_generator = None
-                self.cached_value = None
-                self.is_cached = False
+            if self.__in_use:
+                self.__cleanup_deferred = True
+                return
+        metrics = self.metrics
+        start = 0.0 if metrics is None else time.perf_counter()
+        try:
+            self._cleanup()
+        finally:
+            if metrics is not None:
+                metrics.observe_context_cleanup(
+                    self.name, time.perf_counter() - start
+                )
+
+    def _cleanup(self) -> None:
+        if self.scope == "thread":
+            with self.__lock:
+                items, self.__thread_items = self.__thread_items, []
+                self.__local = threading.local()
+        elif self.scope == "pool":
+            with self.__lock:
+                items, self.__pool_idle = self.__pool_idle, []
+                self.__pool_created -= len(items)
+                self.__epoch += 1
+        else:
+            with self.__lock:
+                if self.is_cached:
+                    _finalize_generator(self._drop())
+            return
+        self._notify()
+        errors = []
+        for _, generator in items:
+            try:
+                _finalize_generator(generator)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
 
 
 class ContextRegistry:
     _reg: Dict[str, Context]
+    metrics: Optional[Metrics]
 
     def __init__(self):
         self._reg = {}
+        self.metrics = None
+
+    def set_metrics(self, metrics: Optional[Metrics]) -> None:
+        """Record initialisation and cleanup time of contexts
+
+        Applies to contexts registered both before and after.
+
+        :param metrics: Where to record, ``None`` to stop recording
+        :type metrics: Optional[Metrics]
+        """
+        self.metrics = metrics
+        for context in self._reg.values():
+            context.metrics = metrics
 
     def register(self, context: Context) -> None:
         """Add context into registry
@@ -71,12 +597,36 @@ class ContextRegistry:
         :param context: The context to add
         :type context: Context
         :raises ValueError: If context name duplicate
+        :raises ValueError: If context dependencies are circular
         """
         if context.name in self._reg:
             raise ValueError(f'Context name "{context.name}" duplicate')
 
+        # Any new cycle must pass through the new context
+        visited = set()
+        stack = list(context.dependencies)
+        while stack:
+            name = stack.pop()
+            if name == context.name:
+                raise ValueError(
+                    f'Circular dependency of context "{context.name}"'
+                )
+            if name in visited or name not in self._reg:
+                continue
+            visited.add(name)
+            stack.extend(self._reg[name].dependencies)
+
+        context.metrics = self.metrics
         self._reg[context.name] = context
 
+    def all(self) -> List[Context]:
+        """Get all contexts in registry
+
+        :return: contexts
+        :rtype: List[Context]
+        """
+        return list(self._reg.values())
+
     def get(self, context_name: str) -> Context:
         """Get context by name from registry
 
@@ -87,35 +637,91 @@ class ContextRegistry:
         """
         return self._reg[context_name]
 
+    def invalidate(self, context_name: str) -> None:
+        """Mark the cached value of a context as expired
+
+        See :meth:`Context.invalidate`
+
+        :param context_name: Name of the context
+        :type context_name: str
+        """
+        self._reg[context_name].invalidate()
+
     def check_command(self, command: Command) -> None:
         """Check whether command has unregistered context
 
+        Dependencies of the contexts are checked and bound as well.
+
         :param command: command to check
         :type command: Command
         :raises ValueError: Unrecognized context name: "{context_name}"
         """
         for context_name in command.contexts:
-            if context_name not in self._reg:
-                raise ValueError(
-                    f'Unrecognized context name: "{context_name}"'
-                )
+            self._bind_dependencies(context_name)
 
-    def update_reference(self, command: Command, increase: bool = True):
+    def _bind_dependencies(self, context_name: str) -> Context:
+        if context_name not in self._reg:
+            raise ValueError(f'Unrecognized context name: "{context_name}"')
+        context = self._reg[context_name]
+        if context.dependency_objects is None:
+            dependency_objects = [
+                self._bind_dependencies(dependency_name)
+                for dependency_name in context.dependencies
+            ]
+            for dependency in dependency_objects:
+                if dependency.scope != "shared":
+                    raise ValueError(
+                        f'Context "{dependency.name}" with scope '
+                        f'"{dependency.scope}" cannot be a dependency'
+                    )
+            context.dependency_objects = dependency_objects
+        return context
+
+    def update_reference(
+        self, command: Command, increase: bool = True
+    ) -> List[Context]:
         """Update references of contexts from a command
 
+        Contexts no longer referenced are cleaned up, including async
+        generator contexts (see :meth:`Context.cleanup`).
+
+        A referenced context holds one reference to each of its
+        dependencies, so the dependencies are cleaned up right after the
+        last context depending on them.
+
         :param command: The command of which contexts to update
         :type command: Command
         :param increase: Increase reference or decrease, defaults to True
         :type increase: bool, optional
         :raises ValueError: When :attr:``reference_count`` reaches negtive
+        :return: Contexts which become referenced
+        :rtype: List[Context]
         """
+        referenced: List[Context] = []
         for context_name in command.contexts:
-            context = self._reg[context_name]
-            context.reference_count += 1 if increase else -1
-            if context.reference_count == 0:
+            self._update_context_reference(
+                self._reg[context_name], increase, referenced
+            )
+        return referenced
+
+    def _update_context_reference(
+        self, context: Context, increase: bool, referenced: List[Context]
+    ) -> None:
+        context.reference_count += 1 if increase else -1
+        if context.reference_count == 1 and increase:
+            referenced.append(context)
+            for dependency in context.dependency_objects or ():
+                self._update_context_reference(dependency, True, referenced)
+        elif context.reference_count == 0:
+            try:
                 context.cleanup()
-            elif context.reference_count < 0:  # pragma: no cover
-                raise ValueError(
-                    "Context reference less than zero. "
-                    "Are you using your own command registry class?"
-                )
+            finally:
+                for dependency in context.dependency_objects or ():
+                    self._update_context_reference(
+                        dependency, False, referenced
+                    )
+        elif context.reference_count < 0:  # pragma: no cover
+            raise ValueError(
+                "Context reference less than zero. "
+                "Are you using your own command registry class?"
+            )
@@ -0,0 +1,134 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, List, Optional, Sequence, Tuple
+
+
+class Bulkhead:
+    """Maximum number of calls running at the same time
+
+    :param limit: Maximum number of running calls
+    :type limit: int
+    :raises ValueError: If limit is not positive
+    """
+
+    limit: int
+    running: int
+
+    def __init__(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError("Bulkhead limit should be a positive integer")
+        self.limit = limit
+        self.running = 0
+
+
+_Task = Tuple[Callable[[], Any], Sequence[Bulkhead], Future]
+
+
+class BulkheadExecutor:
+    """Run calls in a thread pool, limited by bulkheads
+
+    A call exceeding any of its bulkheads waits in a queue instead of in a
+    worker thread, so that calls limited by full bulkheads never occupy
+    the whole pool.
+
+    :param max_workers:
+        Number of worker threads, defaults to the default of
+        :class:`ThreadPoolExecutor`
+    :type max_workers: Optional[int], optional
+    """
+
+    _pool: ThreadPoolExecutor
+    _queue: Deque[_Task]
+    _shutdown: bool
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._pool = ThreadPoolExecutor(max_workers)
+        self._queue = deque()
+        self._shutdown = False
+        self._cond = threading.Condition()
+
+    def submit(
+        self, fn: Callable[[], Any], bulkheads: Sequence[Bulkhead] = ()
+    ) -> Future:
+        """Schedule ``fn`` to run when all of its bulkheads allow
+
+        :raises RuntimeError: If the executor is shut down
+        """
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit after shutdown")
+            if not self._fits(bulkheads):
+                self._queue.append((fn, bulkheads, future))
+                return future
+            self._start(fn, bulkheads, future)
+        return future
+
+    def _fits(self, bulkheads: Sequence[Bulkhead]) -> bool:
+        return all(bulkhead.running < bulkhead.limit for bulkhead in bulkheads)
+
+    def _start(
+        self,
+        fn: Callable[[], Any],
+        bulkheads: Sequence[Bulkhead],
+        future: Future,
+    ) -> None:
+        """Must be called with the lock"""
+        for bulkhead in bulkheads:
+            bulkhead.running += 1
+        self._pool.submit(self._run, fn, bulkheads, future)
+
+    def _run(
+        self,
+        fn: Callable[[], Any],
+        bulkheads: Sequence[Bulkhead],
+        future: Future,
+    ) -> None:
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn()
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            if bulkheads:
+                self._finish(bulkheads)
+
+    def _finish(self, bulkheads: Sequence[Bulkhead]) -> None:
+        with self._cond:
+            for bulkhead in bulkheads:
+                bulkhead.running -= 1
+            # Start queued calls in order as long as they fit
+            waiting: List[_Task] = []
+            while self._queue:
+                task = self._queue.popleft()
+                if task[2].cancelled():
+                    continue
+                if self._fits(task[1]):
+                    self._start(*task)
+                else:
+                    waiting.append(task)
+            self._queue.extend(waiting)
+            self._cond.notify_all()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting calls and release the worker threads
+
+        :param wait:
+            Wait for running and queued calls to finish. Otherwise, queued
+            calls are cancelled. Defaults to True
+        :type wait: bool, optional
+        """
+        with self._cond:
+            self._shutdown = True
+            if wait:
+                self._cond.wait_for(
+                    lambda: all(task[2].cancelled() for task in self._queue)
+                )
+            for _, _, future in self._queue:
+                future.cancel()
+            self._queue.clear()
+        self._pool.shutdown(wait)
@@ -1,30 +1,228 @@
+import re
 from collections import defaultdict
-from typing import Callable, List, Optional
+from typing import (
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .pattern import scoped_source
+
+
+def _as_tuple(value: Union[str, Sequence[str], None]) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value)
+
+
+class FallbackGuard(NamedTuple):
+    """Cheap checks deciding whether to call a fallback handler
+
+    A fallback handler is only called if all the checks given pass.
+    """
+
+    pattern: Optional[Pattern]
+    prefixes: Tuple[str, ...]
+    content_types: Tuple[str, ...]
+    min_length: Optional[int]
+    max_length: Optional[int]
+
+    @classmethod
+    def build(
+        cls,
+        pattern: Union[str, Pattern, None] = None,
+        prefix: Union[str, Sequence[str], None] = None,
+        content_type: Union[str, Sequence[str], None] = None,
+        min_length: Optional[int] = None,
+        max_length: Optional[int] = None,
+    ) -> Optional["FallbackGuard"]:
+        guard = cls(
+            re.compile(pattern) if isinstance(pattern, str) else pattern,
+            _as_tuple(prefix),
+            _as_tuple(content_type),
+            min_length,
+            max_length,
+        )
+        if guard == (None, (), (), None, None):
+            return None
+        return guard
+
+    def check_rest(self, content: str, content_type: Optional[str]) -> bool:
+        """Check everything except the pattern"""
+        if self.prefixes and not content.startswith(self.prefixes):
+            return False
+        if self.content_types and content_type not in self.content_types:
+            return False
+        if self.min_length is not None and len(content) < self.min_length:
+            return False
+        if self.max_length is not None and len(content) > self.max_length:
+            return False
+        return True
 
 
 class FallbackRegistry:
     _reg: defaultdict
     _sorted: Optional[List[Callable]]
+    _guards: Dict[Callable, FallbackGuard]
+    # Built on freezing, see ``_build_index``, and indexes are positions
+    # in ``_sorted``
+    _index_guards: Dict[int, FallbackGuard]
+    _unguarded_indexes: List[int]
+    _combined: Optional[Pattern]
+    _combined_indexes: List[int]
+    _combined_patterns: List[Pattern]
+    _separate_indexes: List[int]
+    _prefix_table: Dict[str, List[int]]
+    _prefix_lengths: List[int]
+    _content_type_table: Dict[str, List[int]]
+    _always_indexes: List[int]
 
     def __init__(self) -> None:
         self._reg = defaultdict(list)
         self._sorted = None
+        self._guards = {}
 
-    def register(self, fallback_func: Callable, priority: int) -> None:
+    def register(
+        self,
+        fallback_func: Callable,
+        priority: int,
+        guard: Optional[FallbackGuard] = None,
+    ) -> None:
         if self._sorted is not None:
             raise ValueError(
                 "Cannot append fallback functions to registry"
                 "because FallbackRegistry is frozen"
             )
         self._reg[priority].append(fallback_func)
+        if guard is not None:
+            self._guards[fallback_func] = guard
 
     def all(self) -> List[Callable]:
         if self._sorted is None:
-            self._sorted = list(
+            sorted_funcs = list(
                 func
                 for _, funcs in sorted(
                     self._reg.items(), key=lambda x: x[0], reverse=True
                 )
                 for func in funcs
             )
+            self._build_index(sorted_funcs)
+            # Frozen only once the index is built
+            self._sorted = sorted_funcs
         return self._sorted
+
+    def _build_index(self, sorted_funcs: List[Callable]) -> None:
+        # Each guarded fallback is indexed by one of its checks, in order
+        # of pattern, prefix and content type. The other checks run only
+        # for the candidates found through the index.
+        index_guards: Dict[int, FallbackGuard] = {}
+        unguarded_indexes: List[int] = []
+        combined_indexes: List[int] = []
+        combined_patterns: List[Pattern] = []
+        separate_indexes: List[int] = []
+        prefix_table: Dict[str, List[int]] = defaultdict(list)
+        content_type_table: Dict[str, List[int]] = defaultdict(list)
+        always_indexes: List[int] = []
+        alternatives = []
+        for index, func in enumerate(sorted_funcs):
+            guard = self._guards.get(func)
+            if guard is None:
+                unguarded_indexes.append(index)
+                continue
+            index_guards[index] = guard
+            if guard.pattern is not None:
+                # Groups in the pattern would shift the groups recording
+                # matches, and break numbered backreferences
+                source = None
+                if not guard.pattern.groups:
+                    try:
+                        source = scoped_source(guard.pattern)
+                    except ValueError:
+                        pass
+                if source is None:
+                    separate_indexes.append(index)
+                    continue
+                combined_indexes.append(index)
+                combined_patterns.append(guard.pattern)
+                # The empty group tells which alternative matched
+                alternatives.append(f"(?:{source})()")
+            elif guard.prefixes:
+                for prefix in guard.prefixes:
+                    prefix_table[prefix].append(index)
+            elif guard.content_types:
+                for content_type in guard.content_types:
+                    content_type_table[content_type].append(index)
+            else:
+                always_indexes.append(index)
+        combined = None
+        if alternatives:
+            combined = re.compile("|".join(alternatives))
+
+        self._index_guards = index_guards
+        self._unguarded_indexes = unguarded_indexes
+        self._combined = combined
+        self._combined_indexes = combined_indexes
+        self._combined_patterns = combined_patterns
+        self._separate_indexes = separate_indexes
+        self._prefix_table = prefix_table
+        self._prefix_lengths = sorted({len(p) for p in prefix_table})
+        self._content_type_table = content_type_table
+        self._always_indexes = always_indexes
+
+    def candidates(
+        self, content: str, content_type: Optional[str] = None
+    ) -> List[Callable]:
+        """Fallback handlers whose guards pass, in order of priority
+
+        Patterns without groups are merged into one regular expression,
+        so input matching none of them, which is the common case, is
+        rejected by a single search. Prefixes and content types are looked
+        up in tables.
+
+        :param content: The text input
+        :type content: str
+        :param content_type: Content type tag of the input, defaults to None
+        :type content_type: Optional[str], optional
+        :return: Fallback handlers to call
+        :rtype: List[Callable]
+        """
+        sorted_funcs = self.all()
+        if not self._index_guards:
+            return sorted_funcs
+
+        indexes = list(self._always_indexes)
+        if self._combined is not None:
+            match = self._combined.search(content)
+            if match is not None:
+                # The search stops at the first match, so check the other
+                # patterns one by one
+                first = match.lastindex - 1  # type: ignore
+                patterns = zip(self._combined_indexes, self._combined_patterns)
+                for position, (index, pattern) in enumerate(patterns):
+                    if position == first or pattern.search(content):
+                        indexes.append(index)
+        for index in self._separate_indexes:
+            if self._index_guards[index].pattern.search(  # type: ignore
+                content
+            ):
+                indexes.append(index)
+        for length in self._prefix_lengths:
+            indexes.extend(self._prefix_table.get(content[:length], ()))
+        if content_type is not None:
+            indexes.extend(self._content_type_table.get(content_type, ()))
+
+        passed = {
+            index
+            for index in indexes
+            if self._index_guards[index].check_rest(content, content_type)
+        }
+        passed.update(self._unguarded_indexes)
+        return [sorted_funcs[index] for index in sorted(passed)]
@@ -1,29 +1,45 @@
+import asyncio
 import threading
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, overload
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from inspect import isasyncgenfunction, isawaitable, iscoroutinefunction
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
 
 try:
     from typing import TypedDict
 except ImportError:
     from typing_extensions import TypedDict
 
-from .command import BaseCommandRegistry, Command, CommandRegistry
+from .cache import LRUCache
+from .command import (
+    BaseCommandRegistry,
+    Command,
+    CommandRegistry,
+    LazyCommand,
+    split_keyword,
+)
 from .context import Context, ContextRegistry
-from .fallback import FallbackRegistry
+from .executor import Bulkhead, BulkheadExecutor
+from .fallback import FallbackGuard, FallbackRegistry
+from .metrics import Metrics
+from .process import compile_process_invoker
+from .ratelimit import RateLimiter
 from .typing_ext import Decorator, F
 
 
-def split_keyword(content: str) -> Tuple[str, str]:
-    """Split content into command name an payload
-
-    :param content: text input to split
-    :type content: str
-    :return: (command name, payload)
-    :rtype: Tuple[str, str]
-    """
-    split_st = content.split(" ", 1)
-    return (split_st[0], split_st[1] if len(split_st) == 2 else "")
-
-
 class Config(TypedDict):
     """Config dict for :class:`ComamndsManager`"""
 
@@ -54,6 +70,17 @@ class Config(TypedDict):
 
     Default to ``"Sorry, this command is currently disabled."``"""
 
+    text_rate_limited: str
+    """What to return if the call exceeds the rate limit of the command.
+
+    Default to ``"Too many requests, please try again later."``"""
+
+    rate_limit_max_keys: int
+    """How many rate limit buckets to keep for each command, the least
+    recently used ones are discarded
+
+    Default to ``4096``"""
+
     command_parameter_ignore: Iterable[str]
     """Ignore these parameters of command handlers when constructing keyword
     arguments to pass
@@ -78,24 +105,122 @@ class Config(TypedDict):
 
     Default to ``True``"""
 
+    fallback_content_type_parameter: str
+    """The keyword argument of :meth:`CommandsManager.exec` matched against
+    ``content_type`` of fallback handlers
+
+    Default to ``"content_type"``"""
+
+    help_cache_size: int
+    """How many responses of :meth:`CommandsManager.help_with_similar`
+    to cache, keyed by the unknown keyword
+
+    Default to ``128``. Set to ``0`` to disable caching"""
+
+    executor_max_workers: Optional[int]
+    """Number of worker threads for :meth:`CommandsManager.submit`
+
+    Default to ``None``, the default of
+    :class:`concurrent.futures.ThreadPoolExecutor`"""
+
+    process_max_workers: Optional[int]
+    """Number of worker processes for commands with ``executor="process"``
+
+    Default to ``None``, the default of
+    :class:`concurrent.futures.ProcessPoolExecutor`"""
+
+    enable_metrics: bool
+    """Whether to record latency and throughput metrics
+
+    Default to ``False``. See :meth:`CommandsManager.stats`. When disabled,
+    executing commands costs nothing extra"""
+
 
 DEFAULT_CONFIG = Config(
     enable_default_fallback=True,
     text_general_response="Copy! But the bot can't understand it.",
     text_possible_command="Did you misspell it? Possible commands are:",
     text_command_closed="Sorry, this command is currently disabled.",
+    text_rate_limited="Too many requests, please try again later.",
+    rate_limit_max_keys=4096,
     command_parameter_ignore=("self",),
     command_context_ignore=(),
     command_payload_parameter="payload",
     command_case_sensitive=True,
+    fallback_content_type_parameter="content_type",
+    help_cache_size=128,
+    executor_max_workers=None,
+    process_max_workers=None,
+    enable_metrics=False,
+)
+
+
+_MISSING = object()
+
+EXECUTORS = (None, "process")
+
+MIDDLEWARE_KINDS = (
+    "pre_dispatch",
+    "around_handler",
+    "post_result",
+    "on_fallback",
 )
 
 
+def _compose(middlewares: List[Callable], handler: Callable) -> Callable:
+    """Chain middlewares around ``handler``, the first one outermost"""
+    for middleware in reversed(middlewares):
+        handler = partial(middleware, call_next=handler)
+    return handler
+
+
+def _post_result_layer(post_result: Callable) -> Callable:
+    def layer(
+        content: str, kwargs: Dict[str, Any], call_next: Callable
+    ) -> Any:
+        return post_result(content, kwargs, call_next(content, kwargs))
+
+    return layer
+
+
+def _apost_result_layer(post_result: Callable) -> Callable:
+    async def layer(
+        content: str, kwargs: Dict[str, Any], call_next: Callable
+    ) -> Any:
+        result = call_next(content, kwargs)
+        if isawaitable(result):
+            result = await result
+        result = post_result(content, kwargs, result)
+        if isawaitable(result):
+            result = await result
+        return result
+
+    return layer
+
+
+def _func_name(func: Callable) -> str:
+    """Name of a function, or repr of a partial or callable object"""
+    return getattr(func, "__name__", repr(func))
+
+
+def _is_sync_context(context: Context) -> bool:
+    """Whether the context and its dependencies are all synchronous"""
+    func = context.context_func
+    if iscoroutinefunction(func) or isasyncgenfunction(func):
+        return False
+    return all(
+        _is_sync_context(dependency)
+        for dependency in context.dependency_objects or ()
+    )
+
+
 class CommandsManager:
     context_reg: ContextRegistry
     command_reg: BaseCommandRegistry
     fallback_reg: FallbackRegistry
     config: Config
+    help_cache: LRUCache
+    metrics: Optional[Metrics]
 
     def __init__(
         self,
@@ -116,8 +241,24 @@ class CommandsManager:
             self.config.update(config)  # type: ignore
         if self.config["enable_default_fallback"]:
             self.fallback_reg.register(self.help_with_similar, priority=-1)
+        self.help_cache = LRUCache(self.config["help_cache_size"])
+        # Only the cold paths check this, commands are wrapped when bound
+        self.metrics = Metrics() if self.config["enable_metrics"] else None
+        if self.metrics is not None:
+            self.context_reg.set_metrics(self.metrics)
 
+        self._cached_commands: Dict[str, Command] = {}
         self.__status_lock = threading.Lock()
+        self.__warmup_executor: Optional[ThreadPoolExecutor] = None
+        self.__executor: Optional[BulkheadExecutor] = None
+        self.__process_pool: Optional[ProcessPoolExecutor] = None
+        self.__executor_lock = threading.Lock()
+        self._bulkheads: Dict[str, Bulkhead] = {}
+
+        self._middlewares: Dict[str, List[Callable]] = {
+            kind: [] for kind in MIDDLEWARE_KINDS
+        }
+        self._compose_middlewares()
 
     def exec(self, content: str, **kwargs) -> Any:
         """Execute given text input ``content``
@@ -127,51 +268,465 @@ class CommandsManager:
         :return: execution result
         :rtype: Any
         """
-        keyword, payload = split_keyword(content)
-        if not self.config["command_case_sensitive"]:
-            keyword = keyword.lower()
-        command = self.command_reg.get(keyword)
+        return self._exec(content, kwargs)
+
+    def submit(self, content: str, **kwargs) -> "Future[Any]":
+        """Execute given text input ``content`` in a worker thread
+
+        Works like :meth:`exec`, but returns at once. Calls of commands
+        limited by :meth:`bulkhead` wait in a queue, without occupying
+        worker threads, until the bulkheads allow. Cleanup of contexts
+        used by a call is deferred until the call finishes.
+
+        :param content: content to execute
+        :type content: str
+        :return: Future of the execution result
+        :rtype: Future[Any]
+        """
+        command, _ = self.command_reg.match(
+            content, self.config["command_case_sensitive"]
+        )
+        if command is None and self.command_reg.has_patterns:
+            command, _ = self._match_pattern(content, kwargs)
+        bulkheads: List[Bulkhead] = []
+        if command is not None:
+            for name in (command.name, *command.groups):
+                bulkhead = self._bulkheads.get(name)
+                if bulkhead is not None:
+                    bulkheads.append(bulkhead)
+        return self._get_executor().submit(
+            partial(self._exec_submitted, command, content, kwargs),
+            bulkheads,
+        )
+
+    def _get_executor(self) -> BulkheadExecutor:
+        with self.__executor_lock:
+            if self.__executor is None:
+                self.__executor = BulkheadExecutor(
+                    self.config["executor_max_workers"]
+                )
+            return self.__executor
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self.__executor_lock:
+            if self.__process_pool is None:
+                self.__process_pool = ProcessPoolExecutor(
+                    self.config["process_max_workers"]
+                )
+            return self.__process_pool
+
+    def _exec_submitted(
+        self, command: Optional[Command], content: str, kwargs: Dict[str, Any]
+    ) -> Any:
+        if command is None:
+            return self._exec(content, kwargs)
+        if not command.is_loaded:
+            self._load_command(command)
+        with self.__status_lock:
+            contexts = command.context_objects
+            for context in contexts:
+                context.retain()
+        try:
+            return self._exec(content, kwargs)
+        finally:
+            with self.__status_lock:
+                for context in contexts:
+                    context.unretain()
+
+    def bulkhead(self, name: str, limit: int) -> None:
+        """Limit running calls of a command or group in :meth:`submit`.
+
+        A call is limited by the bulkheads of both the command and its
+        groups. Calls of :meth:`exec` are not limited.
+
+        :param name: The name of the command or group
+        :type name: str
+        :param limit: Maximum number of calls running at the same time
+        :type limit: int
+        :raises ValueError: If limit is not positive
+        """
+        self._bulkheads[name] = Bulkhead(limit)
+
+    def _dispatch(self, content: str, kwargs: Dict[str, Any]) -> Any:
+        command, payload = self.command_reg.match(
+            content, self.config["command_case_sensitive"]
+        )
+        if command is None and self.command_reg.has_patterns:
+            command, kwargs = self._match_pattern(content, kwargs)
+            payload = content
         if command is not None:
             # checking if command is closed
             if not self.command_reg.resolve_command_status(command):
                 return self.config["text_command_closed"]
+            if command.rate_limiter is not None and (
+                not command.rate_limiter.allow(kwargs)
+            ):
+                return self.config["text_rate_limited"]
+            if not command.is_loaded:
+                self._load_command(command)
             # finnally call it
-            func_args = kwargs.copy()
-            func_args.update(
-                {
-                    context_name: self.context_reg.get(context_name).value
-                    for context_name in command.contexts
-                }
+            return self._handle(command, payload, kwargs)
+
+        return self._fallback(content, kwargs)
+
+    def _match_pattern(
+        self, content: str, kwargs: Dict[str, Any]
+    ) -> Tuple[Optional[Command], Dict[str, Any]]:
+        command, groups = self.command_reg.match_pattern(
+            content, self.config["command_case_sensitive"]
+        )
+        if groups:
+            # Named groups are passed like keyword arguments
+            kwargs = {**kwargs, **groups}
+        return command, kwargs
+
+    def _invoke_command(
+        self, command: Command, payload: str, kwargs: Dict[str, Any]
+    ) -> Any:
+        cache = command.result_cache
+        if cache is None:
+            return self._resolve_and_invoke(command, payload, kwargs)
+        key = command.cache_key(payload, kwargs)
+        for context in command.context_objects:
+            if context._is_expired():
+                # Expiry by ttl is noticed on read, which clears the cache
+                context.value
+        generation = cache.generation
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = self._resolve_and_invoke(command, payload, kwargs)
+            if not isawaitable(result):
+                cache.set(key, result, generation)
+        return result
+
+    def _resolve_and_invoke(
+        self, command: Command, payload: str, kwargs: Dict[str, Any]
+    ) -> Any:
+        if not command.needs_checkout:
+            return command.invoke(
+                payload,
+                kwargs,
+                [context.value for context in command.context_objects],
             )
-            return command(payload=payload, **func_args)
+        values: List[Any] = []
+        try:
+            for context in command.context_objects:
+                values.append(context.acquire())
+            return command.invoke(payload, kwargs, values)
+        finally:
+            for context, value in zip(command.context_objects, values):
+                context.release(value)
+
+    def exec_many(self, contents: Iterable[str], **kwargs) -> List[Any]:
+        """Execute many text inputs in a batch
+
+        Works like calling :meth:`exec` on each of ``contents`` with the same
+        ``kwargs``, but the keyword lookup, the command status and the
+        context values are resolved only once per batch.
+
+        .. note::
+            A context with ``enable_cache=False`` is also evaluated only once
+            per batch.
+
+        .. note::
+            If there are any middlewares, each content is executed with
+            :meth:`exec` instead, so that middlewares see every input.
+
+        :param contents: contents to execute
+        :type contents: Iterable[str]
+        :return: execution results, in the same order as ``contents``
+        :rtype: List[Any]
+        """
+        if self._has_middlewares:
+            return [self._exec(content, kwargs) for content in contents]
+        case_sensitive = self.config["command_case_sensitive"]
+        commands: Dict[str, Optional[Command]] = {}
+        statuses: Dict[str, bool] = {}
+        context_values: Dict[str, Any] = {}
+        results = []
+        # Keywords can only be cached if they are single words
+        cache_keyword = not self.command_reg.use_trie
+        for content in contents:
+            if cache_keyword:
+                keyword, payload = split_keyword(content)
+                try:
+                    command = commands[keyword]
+                except KeyError:
+                    command = commands[keyword] = self.command_reg.get(
+                        keyword if case_sensitive else keyword.lower()
+                    )
+            else:
+                command, payload = self.command_reg.match(
+                    content, case_sensitive
+                )
+            call_kwargs = kwargs
+            if command is None and self.command_reg.has_patterns:
+                command, call_kwargs = self._match_pattern(content, kwargs)
+                payload = content
+            if command is None:
+                results.append(self._exec_fallbacks(content, kwargs))
+                continue
+
+            status = statuses.get(command.name)
+            if status is None:
+                status = statuses[
+                    command.name
+                ] = self.command_reg.resolve_command_status(command)
+            if not status:
+                results.append(self.config["text_command_closed"])
+                continue
+            if command.rate_limiter is not None and (
+                not command.rate_limiter.allow(call_kwargs)
+            ):
+                results.append(self.config["text_rate_limited"])
+                continue
+            if not command.is_loaded:
+                self._load_command(command)
+
+            if command.needs_checkout or command.result_cache is not None:
+                results.append(
+                    self._invoke_command(command, payload, call_kwargs)
+                )
+                continue
+            values = []
+            for context in command.context_objects:
+                if context.name not in context_values:
+                    context_values[context.name] = context.value
+                values.append(context_values[context.name])
+            results.append(command.invoke(payload, call_kwargs, values))
+        return results
+
+    def _exec_fallbacks(self, content: str, kwargs: Dict[str, Any]) -> Any:
+        for fallback_func in self.fallback_reg.candidates(
+            content, kwargs.get(self.config["fallback_content_type_parameter"])
+        ):
+            result = fallback_func(content, **kwargs)
+            if result is not None:
+                if self.metrics is not None:
+                    self.metrics.hit_fallback(_func_name(fallback_func))
+                return result
+        return None
+
+    async def aexec(self, content: str, **kwargs) -> Any:
+        """Asynchronous version of :meth:`exec`
 
-        for fallback_func in self.fallback_reg.all():
+        Coroutine command handlers and fallback handlers are awaited,
+        and contexts are resolved with :meth:`Context.avalue`, so that
+        ``async def`` and async generator contexts are supported.
+
+        :param content: content to execute
+        :type content: str
+        :return: execution result
+        :rtype: Any
+        """
+        result = self._aexec(content, kwargs)
+        if isawaitable(result):
+            result = await result
+        return result
+
+    async def _adispatch(self, content: str, kwargs: Dict[str, Any]) -> Any:
+        command, payload = self.command_reg.match(
+            content, self.config["command_case_sensitive"]
+        )
+        if command is None and self.command_reg.has_patterns:
+            command, kwargs = self._match_pattern(content, kwargs)
+            payload = content
+        if command is not None:
+            if not self.command_reg.resolve_command_status(command):
+                return self.config["text_command_closed"]
+            if command.rate_limiter is not None and (
+                not command.rate_limiter.allow(kwargs)
+            ):
+                return self.config["text_rate_limited"]
+            if not command.is_loaded:
+                self._load_command(command)
+            result = self._ahandle(command, payload, kwargs)
+        else:
+            result = self._afallback(content, kwargs)
+        # Middlewares may return without awaiting call_next
+        if isawaitable(result):
+            result = await result
+        return result
+
+    async def _ainvoke_command(
+        self, command: Command, payload: str, kwargs: Dict[str, Any]
+    ) -> Any:
+        cache = command.result_cache
+        if cache is None:
+            return await self._aresolve_and_invoke(command, payload, kwargs)
+        key = command.cache_key(payload, kwargs)
+        for context in command.context_objects:
+            if context._is_expired():
+                await context.avalue()
+        generation = cache.generation
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = await self._aresolve_and_invoke(command, payload, kwargs)
+            cache.set(key, result, generation)
+        return result
+
+    async def _aresolve_and_invoke(
+        self, command: Command, payload: str, kwargs: Dict[str, Any]
+    ) -> Any:
+        values: List[Any] = []
+        try:
+            for context in command.context_objects:
+                values.append(await context.aacquire())
+            invoke = command.ainvoke or command.invoke
+            result = invoke(payload, kwargs, values)
+            if isawaitable(result):
+                result = await result
+            return result
+        finally:
+            if command.needs_checkout:
+                for context, value in zip(command.context_objects, values):
+                    context.release(value)
+
+    async def _aexec_fallbacks(
+        self, content: str, kwargs: Dict[str, Any]
+    ) -> Any:
+        for fallback_func in self.fallback_reg.candidates(
+            content, kwargs.get(self.config["fallback_content_type_parameter"])
+        ):
             result = fallback_func(content, **kwargs)
+            if isawaitable(result):
+                result = await result
             if result is not None:
+                if self.metrics is not None:
+                    self.metrics.hit_fallback(_func_name(fallback_func))
                 return result
         return None
 
+    def middleware(self, kind: str) -> Decorator:
+        """Decorator to register a middleware.
+
+        Middlewares are chained in order of registration, the first one
+        outermost. The chains are composed on registration, so executing
+        costs one call per middleware. Kinds of middlewares are:
+
+        - ``"pre_dispatch"``: ``(content, kwargs, call_next)``, around the
+          whole execution, before the keyword lookup
+        - ``"around_handler"``: ``(command, payload, kwargs, call_next)``,
+          around calling the command handler
+        - ``"post_result"``: ``(content, kwargs, result)``, returning the
+          result to use instead, for both command and fallback results
+        - ``"on_fallback"``: ``(content, kwargs, call_next)``, around
+          calling fallback handlers
+
+        ``call_next`` takes the same arguments except ``call_next`` itself.
+        With :meth:`aexec`, ``call_next`` may return an awaitable and
+        the middleware may be a coroutine function.
+
+        :param kind: Kind of the middleware
+        :type kind: str
+        :raises ValueError: If the kind is unknown
+        """
+        if kind not in MIDDLEWARE_KINDS:
+            raise ValueError(
+                f'Unknown middleware kind "{kind}", '
+                f"should be one of {MIDDLEWARE_KINDS}"
+            )
+
+        def deco(middleware_func: F) -> F:
+            self._middlewares[kind].append(middleware_func)
+            self._compose_middlewares()
+            return middleware_func
+
+        return deco
+
+    def _compose_middlewares(self) -> None:
+        middlewares = self._middlewares
+        self._handle = _compose(
+            middlewares["around_handler"], self._invoke_command
+        )
+        self._ahandle = _compose(
+            middlewares["around_handler"], self._ainvoke_command
+        )
+        self._fallback = _compose(
+            middlewares["on_fallback"], self._exec_fallbacks
+        )
+        self._afallback = _compose(
+            middlewares["on_fallback"], self._aexec_fallbacks
+        )
+        self._exec = _compose(
+            middlewares["pre_dispatch"]
+            + [
+                _post_result_layer(func) for func in middlewares["post_result"]
+            ],
+            self._dispatch,
+        )
+        self._aexec = _compose(
+            middlewares["pre_dispatch"]
+            + [
+                _apost_result_layer(func)
+                for func in middlewares["post_result"]
+            ],
+            self._adispatch,
+        )
+        self._has_middlewares = any(middlewares.values())
+
     @overload
     def context(self, context_func: F) -> F:
         ...
 
     @overload
     def context(
-        self, context_func: None = ..., *, enable_cache: bool = ...
+        self,
+        context_func: None = ...,
+        *,
+        enable_cache: bool = ...,
+        ttl: Optional[float] = ...,
+        refresh: str = ...,
+        scope: str = ...,
+        size: Optional[int] = ...,
     ) -> Decorator:
         ...
 
     def context(
-        self, context_func: Optional[F] = None, *, enable_cache: bool = True
+        self,
+        context_func: Optional[F] = None,
+        *,
+        enable_cache: bool = True,
+        ttl: Optional[float] = None,
+        refresh: str = "sync",
+        scope: str = "shared",
+        size: Optional[int] = None,
     ) -> Union[F, Decorator]:
         """Decorator to register a context (a.k.a. command dependency).
 
         This decorator can be used with or without parentheses.
+
+        :param enable_cache: Whether to cache the value, defaults to True
+        :type enable_cache: bool, optional
+        :param ttl:
+            Seconds before the cached value expires,
+            defaults to ``None`` (never expires)
+        :type ttl: Optional[float], optional
+        :param refresh:
+            ``"sync"`` to create the new value on read after expiry, or
+            ``"background"`` to keep returning the stale value while a
+            background worker creates the new one, defaults to ``"sync"``
+        :type refresh: str, optional
+        :param scope:
+            ``"shared"`` to share one value for all calls, ``"thread"`` for
+            one value per thread, or ``"pool"`` for a pool of ``size``
+            values, each used by one command call at a time,
+            defaults to ``"shared"``
+        :type scope: str, optional
+        :param size: Pool size for ``scope="pool"``
+        :type size: Optional[int], optional
         """
 
         def deco(context_func: F) -> F:
             self.context_reg.register(
-                Context(context_func, enable_cache=enable_cache)
+                Context(
+                    context_func,
+                    enable_cache=enable_cache,
+                    ttl=ttl,
+                    refresh=refresh,
+                    scope=scope,
+                    size=size,
+                )
             )
             return context_func
 
@@ -185,12 +740,28 @@ class CommandsManager:
 
     @overload
     def fallback(
-        self, fallback_func: None = ..., *, priority: int = ...
+        self,
+        fallback_func: None = ...,
+        *,
+        priority: int = ...,
+        pattern: Union[str, Pattern, None] = ...,
+        prefix: Union[str, Sequence[str], None] = ...,
+        content_type: Union[str, Sequence[str], None] = ...,
+        min_length: Optional[int] = ...,
+        max_length: Optional[int] = ...,
     ) -> Decorator:
         ...
 
     def fallback(
-        self, fallback_func: Optional[F] = None, *, priority: int = 10
+        self,
+        fallback_func: Optional[F] = None,
+        *,
+        priority: int = 10,
+        pattern: Union[str, Pattern, None] = None,
+        prefix: Union[str, Sequence[str], None] = None,
+        content_type: Union[str, Sequence[str], None] = None,
+        min_length: Optional[int] = None,
+        max_length: Optional[int] = None,
     ) -> Decorator:
         """Decorator to register a fallback handler.
 
@@ -204,10 +775,39 @@ class CommandsManager:
             Fallback handlers with higher priority will be called first,
             defaults to 10
         :type priority: int, optional
+        :param pattern:
+            Only call the handler if the regular expression is found in
+            the input, defaults to None
+        :type pattern: Union[str, Pattern, None], optional
+        :param prefix:
+            Only call the handler if the input starts with the prefix,
+            or one of the prefixes, defaults to None
+        :type prefix: Union[str, Sequence[str], None], optional
+        :param content_type:
+            Only call the handler if the content type passed to
+            :meth:`CommandsManager.exec` is one of these,
+            see :attr:`Config.fallback_content_type_parameter`,
+            defaults to None
+        :type content_type: Union[str, Sequence[str], None], optional
+        :param min_length:
+            Only call the handler if the input is at least this long,
+            defaults to None
+        :type min_length: Optional[int], optional
+        :param max_length:
+            Only call the handler if the input is at most this long,
+            defaults to None
+        :type max_length: Optional[int], optional
+
+        The guards are checked together for all fallback handlers, see
+        :meth:`FallbackRegistry.candidates`, and a handler is called only
+        if all its guards pass.
         """
+        guard = FallbackGuard.build(
+            pattern, prefix, content_type, min_length, max_length
+        )
 
         def deco(fallback_func: F) -> F:
-            self.fallback_reg.register(fallback_func, priority)
+            self.fallback_reg.register(fallback_func, priority, guard)
             return fallback_func
 
         if fallback_func:
@@ -225,6 +825,13 @@ class CommandsManager:
         *,
         keywords: Iterable[str] = ...,
         groups: Iterable[str] = ...,
+        prefix: bool = ...,
+        pattern: Union[str, Pattern, None] = ...,
+        rate_limit: Optional[str] = ...,
+        per: Optional[str] = ...,
+        cache: Optional[LRUCache] = ...,
+        cache_kwargs: Iterable[str] = ...,
+        executor: Optional[str] = ...,
     ) -> Decorator:
         ...
 
@@ -234,6 +841,13 @@ class CommandsManager:
         *,
         keywords: Iterable[str] = None,
         groups: Iterable[str] = None,
+        prefix: bool = False,
+        pattern: Union[str, Pattern, None] = None,
+        rate_limit: Optional[str] = None,
+        per: Optional[str] = None,
+        cache: Optional[LRUCache] = None,
+        cache_kwargs: Iterable[str] = (),
+        executor: Optional[str] = None,
     ) -> Decorator:
         """Decorator to register a command handler.
 
@@ -249,36 +863,237 @@ class CommandsManager:
         :param keywords:
             Keywords for command. A keyword is a leading word of text input,
             separated with the rest part by a space.
-            Defaults to the name of the comamnd function
+            Defaults to the name of the comamnd function, or no keywords
+            if ``pattern`` is given
         :type keywords: Iterable[str], optional
         :param groups: Group names of the command, defaults to ``[]``
         :type groups: Iterable[str], optional
+        :param prefix:
+            Match input starting with the keywords even without a
+            following space. Requires a command registry created with
+            ``trie=True``, defaults to False
+        :type prefix: bool, optional
+        :param pattern:
+            Regular expression to search input with no matching keyword,
+            like ``r"^(?P<count>\\d+)d(?P<sides>\\d+)$"``. The handler is
+            called with the whole input as payload, and named groups of
+            the pattern as parameters. All patterns are merged into one,
+            so the input is searched once, defaults to None
+        :type pattern: Union[str, Pattern, None], optional
+        :param rate_limit:
+            Maximum rate of calls like ``"5/10s"``, checked with a token
+            bucket before resolving contexts. Calls over the limit get
+            :attr:`Config.text_rate_limited`, defaults to ``None`` (no limit)
+        :type rate_limit: Optional[str], optional
+        :param per:
+            Keyword argument of :meth:`exec` to limit the rate separately
+            for, like ``"user_id"``, defaults to ``None`` (limit all calls
+            together)
+        :type per: Optional[str], optional
+        :param cache:
+            Cache for results of the handler, keyed on the payload and
+            ``cache_kwargs``. Only for handlers returning the same result for
+            the same input. The cache is cleared when the command is closed,
+            or a context of the command is refreshed or cleaned up,
+            defaults to ``None`` (no caching)
+        :type cache: Optional[LRUCache], optional
+        :param cache_kwargs:
+            Keyword arguments of :meth:`exec` the result depends on,
+            defaults to ``()``
+        :type cache_kwargs: Iterable[str], optional
+        :param executor:
+            ``"process"`` to call the handler in a worker process, for
+            CPU-bound handlers. Only the payload and the keyword arguments
+            the handler takes are sent to the worker, and contexts are
+            created and cached in each worker. The handler and contexts
+            must be picklable (module-level) functions,
+            defaults to ``None`` (call in the current thread)
+        :type executor: Optional[str], optional
         """
+        if executor not in EXECUTORS:
+            raise ValueError(
+                f'Unknown executor "{executor}", should be one of {EXECUTORS}'
+            )
 
         def deco(command_func: F) -> F:
             command = Command(
                 command_func,
                 keywords
-                or (
-                    [command_func.__name__]
-                    if self.config["command_case_sensitive"]
-                    else [command_func.__name__.lower()]
-                ),
+                or self._default_keywords(command_func.__name__, pattern),
                 groups or [],
                 parameter_ignore=self.config["command_parameter_ignore"],
                 context_ignore=self.config["command_context_ignore"],
                 payload_parameter=self.config["command_payload_parameter"],
+                prefix=prefix,
+                pattern=pattern,
             )
+            command.rate_limiter = self._make_rate_limiter(rate_limit, per)
+            self._set_result_cache(command, cache, cache_kwargs)
+            command.executor = executor
             self.command_reg.register(command)
-            self.context_reg.check_command(command)
-            if self.command_reg.resolve_command_status(command):
-                self.context_reg.update_reference(command)
+            self._bind_command(command)
+            self.help_cache.clear()
             return command_func
 
         if command_func:
             return deco(command_func)
         return deco
 
+    def lazy_command(
+        self,
+        import_path: str,
+        *,
+        keywords: Iterable[str] = None,
+        groups: Iterable[str] = None,
+        prefix: bool = False,
+        pattern: Union[str, Pattern, None] = None,
+        help: Optional[str] = None,
+        rate_limit: Optional[str] = None,
+        per: Optional[str] = None,
+        cache: Optional[LRUCache] = None,
+        cache_kwargs: Iterable[str] = (),
+    ) -> None:
+        """Register a command handler by import path without importing it.
+
+        The module is imported on the first execution of the command,
+        or when the command is opened. Until then, contexts of the command
+        are not referenced.
+
+        .. code-block:: python
+
+            mgr.lazy_command("plugins.weather:forecast", groups=["weather"])
+
+        :param import_path:
+            Where to import the handler, like ``"package.module:function"``
+        :type import_path: str
+        :param help:
+            Help string, to avoid importing the handler for help of similar
+            commands, defaults to the docstring of the handler
+        :type help: Optional[str], optional
+
+        For other parameters, see :meth:`command`.
+        """
+        command = LazyCommand(
+            import_path,
+            keywords=[],
+            groups=groups or [],
+            parameter_ignore=self.config["command_parameter_ignore"],
+            context_ignore=self.config["command_context_ignore"],
+            payload_parameter=self.config["command_payload_parameter"],
+            prefix=prefix,
+            help=help,
+            pattern=pattern,
+        )
+        command.rate_limiter = self._make_rate_limiter(rate_limit, per)
+        self._set_result_cache(command, cache, cache_kwargs)
+        command.keywords = keywords or self._default_keywords(
+            command.name, pattern
+        )
+        self.command_reg.register(command)
+        self.help_cache.clear()
+
+    def _default_keywords(
+        self, name: str, pattern: Union[str, Pattern, None]
+    ) -> List[str]:
+        if pattern is not None:
+            return []
+        if self.config["command_case_sensitive"]:
+            return [name]
+        return [name.lower()]
+
+    def _make_rate_limiter(
+        self, rate_limit: Optional[str], per: Optional[str]
+    ) -> Optional[RateLimiter]:
+        if rate_limit is None:
+            if per is not None:
+                raise ValueError("Cannot set per without rate_limit")
+            return None
+        return RateLimiter(rate_limit, per, self.config["rate_limit_max_keys"])
+
+    def _set_result_cache(
+        self,
+        command: Command,
+        cache: Optional[LRUCache],
+        cache_kwargs: Iterable[str],
+    ) -> None:
+        cache_kwargs = tuple(cache_kwargs)
+        if cache is None:
+            if cache_kwargs:
+                raise ValueError("Cannot set cache_kwargs without cache")
+            return
+        command.result_cache = cache
+        command.cache_kwargs = cache_kwargs
+        self._cached_commands[command.name] = command
+
+    def _bind_command(self, command: Command) -> List[Context]:
+        self.context_reg.check_command(command)
+        command.bind_contexts(
+            [self.context_reg.get(name) for name in command.contexts]
+        )
+        if command.executor == "process":
+            self._bind_process_command(command)
+        if command.result_cache is not None:
+            for context in command.context_objects:
+                context.add_listener(command.result_cache.clear)
+        if self.metrics is not None:
+            command.invoke = self.metrics.wrap_invoke(  # type: ignore
+                command.name, command.invoke
+            )
+            if command.ainvoke is not None:
+                command.ainvoke = self.metrics.wrap_invoke(
+                    command.name, command.ainvoke
+                )
+        if self.command_reg.resolve_command_status(command):
+            return self.context_reg.update_reference(command)
+        return []
+
+    def _bind_process_command(self, command: Command) -> None:
+        if iscoroutinefunction(command.command_func):
+            raise ValueError(
+                f'Command "{command.name}" with executor="process" '
+                "cannot be a coroutine function"
+            )
+        # Pickling itself would fail while the decorator runs, before the
+        # module-level name is assigned, so only reject functions which
+        # cannot be looked up by reference in the worker process
+        funcs = [command.command_func]
+        contexts = list(command.context_objects)
+        while contexts:
+            context = contexts.pop()
+            funcs.append(context.context_func)
+            contexts.extend(context.dependency_objects or ())
+        for func in funcs:
+            if "<" in getattr(func, "__qualname__", ""):
+                raise ValueError(
+                    f'Command "{command.name}" with executor="process" and '
+                    "its contexts should be module-level functions"
+                )
+        command.invoke = compile_process_invoker(  # type: ignore
+            command, command.context_objects, self._get_process_pool
+        )
+        command.ainvoke = compile_process_invoker(
+            command,
+            command.context_objects,
+            self._get_process_pool,
+            asynchronous=True,
+        )
+        # Contexts are created in worker processes, so the command holds
+        # no references to them here, and they are never warmed up or
+        # created in this process for the command
+        command.contexts = []
+        command.bind_contexts(())
+
+    def _load_command(self, command: Command) -> None:
+        with self.__status_lock:
+            if not command.is_loaded:
+                self._load_command_locked(command)
+
+    def _load_command_locked(self, command: Command) -> List[Context]:
+        command.load()  # type: ignore
+        referenced = self._bind_command(command)
+        command.is_loaded = True
+        return referenced
+
     def close(self, name: str) -> None:
         """Mark a command or group as closed.
 
@@ -288,39 +1103,292 @@ class CommandsManager:
         with self.__status_lock:
             if not self.command_reg.get_status(name):
                 return
-            for command_closed in self.command_reg.close(name):
-                self.context_reg.update_reference(
-                    command_closed, increase=False
-                )
+            commands_closed = self.command_reg.close(name)
+            for command_closed in commands_closed:
+                self._dereference_closed(command_closed)
+            if commands_closed:
+                self.help_cache.clear()
 
-    def open(self, name: str) -> None:
+    def open(self, name: str, eager: bool = False) -> None:
         """Mark a command or group as open.
 
         :param name: The name of the command or group to open.
         :type name: str
+        :param eager:
+            Initialise newly referenced contexts in the background,
+            defaults to False
+        :type eager: bool, optional
         """
+        referenced: List[Context] = []
         with self.__status_lock:
             if self.command_reg.get_status(name):
                 return
-            for command_opened in self.command_reg.open(name):
-                self.context_reg.update_reference(
-                    command_opened, increase=True
-                )
-
-    def batch_update_status(self, status_diff: Dict[str, bool]) -> None:
+            commands_opened = self.command_reg.open(name)
+            if commands_opened:
+                self.help_cache.clear()
+            referenced = self._reference_all_opened(commands_opened)
+        if eager:
+            self._warmup_in_background(referenced)
+
+    def batch_update_status(
+        self, status_diff: Dict[str, bool], eager: bool = False
+    ) -> None:
+        """Update status of commands and groups at once.
+
+        :param status_diff: Names to open (``True``) or close (``False``)
+        :type status_diff: Dict[str, bool]
+        :param eager:
+            Initialise newly referenced contexts in the background,
+            defaults to False
+        :type eager: bool, optional
+        """
+        with self.__status_lock:
+            referenced = self._batch_update_status_locked(status_diff)
+        if eager:
+            self._warmup_in_background(referenced)
+
+    def _batch_update_status_locked(
+        self, status_diff: Dict[str, bool]
+    ) -> List[Context]:
+        (
+            commands_closed,
+            commands_opened,
+        ) = self.command_reg.batch_update_status(status_diff)
+        for command_closed in commands_closed:
+            self._dereference_closed(command_closed)
+        if commands_closed or commands_opened:
+            self.help_cache.clear()
+        return self._reference_all_opened(commands_opened)
+
+    def sync_status(self, eager: bool = False) -> Dict[str, bool]:
+        """Apply status changes made elsewhere, e.g. by other processes.
+
+        Only useful with a command registry sharing status, like
+        :class:`SQLiteCommandRegistry`. Call it after registering commands
+        and then periodically, or before executing.
+
+        :param eager:
+            Initialise newly referenced contexts in the background,
+            defaults to False
+        :type eager: bool, optional
+        :return: The status changes applied
+        :rtype: Dict[str, bool]
+        """
+        with self.__status_lock:
+            status_diff = self.command_reg.pull_status_diff()
+            if not status_diff:
+                return status_diff
+            with self.command_reg.applying_pulled():
+                referenced = self._batch_update_status_locked(status_diff)
+        if eager:
+            self._warmup_in_background(referenced)
+        return status_diff
+
+    def add_group(self, name: str, parents: Iterable[str]) -> None:
+        """Make group ``name`` a subgroup of ``parents``.
+
+        Closing or opening a parent group closes or opens the commands of
+        its subgroups as well, and status is still resolved in O(1) on
+        execution. See :meth:`BaseCommandRegistry.add_group`.
+
+        :param name: The name of the group
+        :type name: str
+        :param parents: Names of the parent groups
+        :type parents: Iterable[str]
+        """
         with self.__status_lock:
-            (
-                commands_closed,
-                commands_opened,
-            ) = self.command_reg.batch_update_status(status_diff)
+            commands_closed = self.command_reg.add_group(name, parents)
             for command_closed in commands_closed:
-                self.context_reg.update_reference(
-                    command_closed, increase=False
-                )
-            for command_opened in commands_opened:
-                self.context_reg.update_reference(
-                    command_opened, increase=True
+                self._dereference_closed(command_closed)
+            if commands_closed:
+                self.help_cache.clear()
+
+    def _dereference_closed(self, command: Command) -> None:
+        if command.result_cache is not None:
+            command.result_cache.clear()
+        if command.is_loaded:
+            self.context_reg.update_reference(command, increase=False)
+
+    def _reference_all_opened(
+        self, commands: Iterable[Command]
+    ) -> List[Context]:
+        referenced: List[Context] = []
+        error: Optional[Exception] = None
+        for command in commands:
+            # The registry has already marked all of them open, so keep
+            # referencing the rest if a lazy command fails to load. The
+            # failed one stays unloaded and is loaded again on use.
+            try:
+                referenced.extend(self._reference_opened(command))
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+        return referenced
+
+    def _reference_opened(self, command: Command) -> List[Context]:
+        if not command.is_loaded:
+            # Contexts are referenced on loading
+            return self._load_command_locked(command)
+        return self.context_reg.update_reference(command, increase=True)
+
+    def warmup(self, max_workers: Optional[int] = None) -> None:
+        """Initialise all referenced contexts concurrently.
+
+        Call it after registering commands, e.g. on startup, so that the
+        first executions do not wait for slow contexts.
+        Only shared and cached contexts are initialised.
+
+        :param max_workers:
+            Number of threads, defaults to that of
+            :class:`concurrent.futures.ThreadPoolExecutor`
+        :type max_workers: Optional[int], optional
+        """
+        contexts = self._contexts_to_warmup(self.context_reg.all())
+        if not contexts:
+            return
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(getattr, context, "value")
+                for context in contexts
+            ]
+            for future in futures:
+                future.result()
+
+    async def awarmup(self, max_workers: Optional[int] = None) -> None:
+        """Asynchronous version of :meth:`warmup`
+
+        Synchronous contexts are initialised in worker threads, so that
+        they do not block the event loop, then asynchronous ones are
+        awaited concurrently.
+
+        :param max_workers:
+            Number of threads for synchronous contexts, defaults to that of
+            :class:`concurrent.futures.ThreadPoolExecutor`
+        :type max_workers: Optional[int], optional
+        """
+        contexts = self._contexts_to_warmup(self.context_reg.all())
+        sync_contexts = [
+            context for context in contexts if _is_sync_context(context)
+        ]
+        if sync_contexts:
+            loop = asyncio.get_event_loop()
+            executor = ThreadPoolExecutor(max_workers)
+            try:
+                await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            executor, getattr, context, "value"
+                        )
+                        for context in sync_contexts
+                    )
                 )
+            finally:
+                executor.shutdown(wait=False)
+        # Dependencies of asynchronous contexts may be synchronous, so they
+        # are initialised after the synchronous ones are cached
+        await asyncio.gather(
+            *(
+                context.avalue()
+                for context in contexts
+                if context not in sync_contexts
+            )
+        )
+
+    def _contexts_to_warmup(self, contexts: List[Context]) -> List[Context]:
+        return [
+            context
+            for context in contexts
+            if context.reference_count > 0
+            and context.scope == "shared"
+            and context.enable_cache
+        ]
+
+    def _warmup_in_background(self, contexts: List[Context]) -> None:
+        # Errors are ignored here, and raised again on execution
+        contexts = self._contexts_to_warmup(contexts)
+        if not contexts:
+            return
+        if self.__warmup_executor is None:
+            self.__warmup_executor = ThreadPoolExecutor(
+                thread_name_prefix="command4bot-warmup"
+            )
+        for context in contexts:
+            self.__warmup_executor.submit(getattr, context, "value")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down background workers of the manager.
+
+        Calls submitted with :meth:`submit` but not started yet are
+        cancelled, unless ``wait`` is true.
+
+        :param wait: Wait for running tasks to finish, defaults to True
+        :type wait: bool, optional
+        """
+        if self.__warmup_executor is not None:
+            self.__warmup_executor.shutdown(wait)
+            self.__warmup_executor = None
+        with self.__executor_lock:
+            executor, self.__executor = self.__executor, None
+            process_pool, self.__process_pool = self.__process_pool, None
+        if executor is not None:
+            executor.shutdown(wait)
+        if process_pool is not None:
+            process_pool.shutdown(wait)
+
+    def invalidate(self, name: str) -> None:
+        """Mark the cached value of a context as expired.
+
+        :param name: The name of the context to invalidate.
+        :type name: str
+        """
+        self.context_reg.invalidate(name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the metrics.
+
+        Requires :attr:`Config.enable_metrics`. See :meth:`Metrics.stats`.
+
+        :raises RuntimeError: If metrics are disabled
+        :return: Metrics of commands, contexts, fallbacks and fuzzy match
+        :rtype: Dict[str, Any]
+        """
+        return self._get_metrics().stats()
+
+    def export_prometheus(self) -> str:
+        """Export the metrics in Prometheus text format.
+
+        Requires :attr:`Config.enable_metrics`.
+
+        :raises RuntimeError: If metrics are disabled
+        :return: Metrics text
+        :rtype: str
+        """
+        return self._get_metrics().to_prometheus()
+
+    def cache_info(self) -> Dict[str, Dict[str, int]]:
+        """Get statistics of result caches of commands.
+
+        :return: Hits, misses and size of the cache of each command
+            registered with ``cache``
+        :rtype: Dict[str, Dict[str, int]]
+        """
+        return {
+            name: {
+                "hits": command.result_cache.hits,  # type: ignore
+                "misses": command.result_cache.misses,  # type: ignore
+                "size": len(command.result_cache),  # type: ignore
+            }
+            for name, command in self._cached_commands.items()
+        }
+
+    def _get_metrics(self) -> Metrics:
+        if self.metrics is None:
+            raise RuntimeError(
+                "Metrics are disabled, set enable_metrics=True to enable"
+            )
+        return self.metrics
 
     def help_with_similar(self, content: str, **kwargs) -> str:
         """Return helps with similar commands hint.
@@ -328,6 +1396,9 @@ class CommandsManager:
         This is the default fallback handler
         and will be registered in ``__init__``.
 
+        Responses are cached in :attr:`help_cache` by keyword, and the cache
+        is cleared whenever the set of open commands changes.
+
         :param content: The text input
         :type content: str
         :return: Help message
@@ -335,18 +1406,25 @@ class CommandsManager:
         """
 
         keyword, _ = split_keyword(content)
+        generation = self.help_cache.generation
+        response = self.help_cache.get(keyword)
+        if response is not None:
+            return response
         # get command not found help message
         helps = self.get_possible_keywords_help(keyword)
         # No similar commands found
         if not helps:
-            return self.config["text_general_response"]
-        # print similar commands
-        return "\n".join(
-            (
-                self.config["text_possible_command"],
-                *helps,
+            response = self.config["text_general_response"]
+        else:
+            # print similar commands
+            response = "\n".join(
+                (
+                    self.config["text_possible_command"],
+                    *helps,
+                )
             )
-        )
+        self.help_cache.set(keyword, response, generation)
+        return response
 
     def get_possible_keywords_help(self, keyword: str) -> List[str]:
         """Get the help of keywords similar to ``keyword``.
@@ -358,7 +1436,10 @@ class CommandsManager:
         :return: Brief help string of the similar commands.
         :rtype: List[str]
         """
-        return [
-            command.brief_help
-            for command in self.command_reg.get_similar_commands(keyword)
-        ]
+        if self.metrics is None:
+            commands = self.command_reg.get_similar_commands(keyword)
+        else:
+            start = time.perf_counter()
+            commands = self.command_reg.get_similar_commands(keyword)
+            self.metrics.observe_fuzzy_match(time.perf_counter() - start)
+        return [command.brief_help for command in commands]
@@ -0,0 +1,256 @@
+import threading
+from bisect import bisect_left
+from inspect import isawaitable
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+# Exponential buckets from 1us to about 67s
+BUCKETS = tuple(1e-6 * 2 ** i for i in range(27))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, in seconds"""
+
+    counts: List[int]
+    count: int
+    sum: float
+
+    def __init__(self) -> None:
+        # The last one is for values above all buckets
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile, interpolating inside buckets
+
+        :return: The estimation, or ``None`` if nothing observed
+        :rtype: Optional[float]
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[i - 1] if i else 0.0
+                return lower + (BUCKETS[i] - lower) * (
+                    (rank - cumulative) / count
+                )
+            cumulative += count
+        return BUCKETS[-1]  # pragma: no cover
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def prometheus_lines(self, name: str, labels: str) -> List[str]:
+        sep = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}'
+            )
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        labels = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{labels} {self.sum!r}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class Metrics:
+    """Latency and throughput metrics of a :class:`CommandsManager`
+
+    Enabled with :attr:`Config.enable_metrics`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.command_calls: Dict[str, int] = {}
+        self.command_errors: Dict[str, int] = {}
+        self.command_latency: Dict[str, Histogram] = {}
+        self.context_init: Dict[str, Histogram] = {}
+        self.context_cleanup: Dict[str, Histogram] = {}
+        self.fallback_hits: Dict[str, int] = {}
+        self.fuzzy_match = Histogram()
+
+    def observe_command(self, name: str, seconds: float, error: bool) -> None:
+        with self._lock:
+            self.command_calls[name] = self.command_calls.get(name, 0) + 1
+            if error:
+                self.command_errors[name] = (
+                    self.command_errors.get(name, 0) + 1
+                )
+            histogram = self.command_latency.get(name)
+            if histogram is None:
+                histogram = self.command_latency[name] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_context_init(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.context_init.setdefault(name, Histogram()).observe(seconds)
+
+    def observe_context_cleanup(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.context_cleanup.setdefault(name, Histogram()).observe(seconds)
+
+    def hit_fallback(self, name: str) -> None:
+        with self._lock:
+            self.fallback_hits[name] = self.fallback_hits.get(name, 0) + 1
+
+    def observe_fuzzy_match(self, seconds: float) -> None:
+        with self._lock:
+            self.fuzzy_match.observe(seconds)
+
+    def wrap_invoke(
+        self,
+        name: str,
+        invoke: Callable[[str, Dict[str, Any], Sequence[Any]], Any],
+    ) -> Callable[[str, Dict[str, Any], Sequence[Any]], Any]:
+        """Wrap :attr:`Command.invoke` to record calls, errors and latency
+
+        Coroutines returned by the handler are timed until they finish.
+        """
+
+        async def timed_awaitable(result: Awaitable, start: float) -> Any:
+            try:
+                value = await result
+            except BaseException:
+                self.observe_command(name, perf_counter() - start, True)
+                raise
+            self.observe_command(name, perf_counter() - start, False)
+            return value
+
+        def timed_invoke(
+            payload: str, kwargs: Dict[str, Any], context_values: Sequence[Any]
+        ) -> Any:
+            start = perf_counter()
+            try:
+                result = invoke(payload, kwargs, context_values)
+            except BaseException:
+                self.observe_command(name, perf_counter() - start, True)
+                raise
+            if isawaitable(result):
+                return timed_awaitable(result, start)
+            self.observe_command(name, perf_counter() - start, False)
+            return result
+
+        return timed_invoke
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of all metrics
+
+        Latencies are in seconds, with quantiles estimated from histograms.
+        """
+        with self._lock:
+            return {
+                "commands": {
+                    name: {
+                        "calls": calls,
+                        "errors": self.command_errors.get(name, 0),
+                        **self.command_latency[name].summary(),
+                    }
+                    for name, calls in self.command_calls.items()
+                },
+                "contexts": {
+                    name: {
+                        "init": self.context_init[name].summary()
+                        if name in self.context_init
+                        else None,
+                        "cleanup": self.context_cleanup[name].summary()
+                        if name in self.context_cleanup
+                        else None,
+                    }
+                    for name in {*self.context_init, *self.context_cleanup}
+                },
+                "fallbacks": dict(self.fallback_hits),
+                "fuzzy_match": self.fuzzy_match.summary(),
+            }
+
+    def to_prometheus(self, prefix: str = "command4bot") -> str:
+        """Export metrics in Prometheus text format
+
+        :param prefix: Prefix of metric names, defaults to "command4bot"
+        :type prefix: str, optional
+        :return: Metrics text
+        :rtype: str
+        """
+        lines = []
+
+        def header(name: str, kind: str, help: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        with self._lock:
+            header("command_calls_total", "counter", "Command calls")
+            for name, calls in self.command_calls.items():
+                lines.append(
+                    f"{prefix}_command_calls_total"
+                    f'{{command="{_escape(name)}"}} {calls}'
+                )
+            header("command_errors_total", "counter", "Command errors")
+            for name in self.command_calls:
+                lines.append(
+                    f"{prefix}_command_errors_total"
+                    f'{{command="{_escape(name)}"}} '
+                    f"{self.command_errors.get(name, 0)}"
+                )
+            for metric, histograms, label, help in (
+                (
+                    "command_latency_seconds",
+                    self.command_latency,
+                    "command",
+                    "Command handler latency",
+                ),
+                (
+                    "context_init_seconds",
+                    self.context_init,
+                    "context",
+                    "Context initialisation time",
+                ),
+                (
+                    "context_cleanup_seconds",
+                    self.context_cleanup,
+                    "context",
+                    "Context cleanup time",
+                ),
+            ):
+                header(metric, "histogram", help)
+                for name, histogram in histograms.items():
+                    lines.extend(
+                        histogram.prometheus_lines(
+                            f"{prefix}_{metric}",
+                            f'{label}="{_escape(name)}"',
+                        )
+                    )
+            header("fallback_hits_total", "counter", "Fallback responses")
+            for name, hits in self.fallback_hits.items():
+                lines.append(
+                    f"{prefix}_fallback_hits_total"
+                    f'{{fallback="{_escape(name)}"}} {hits}'
+                )
+            header("fuzzy_match_seconds", "histogram", "Fuzzy match time")
+            lines.extend(
+                self.fuzzy_match.prometheus_lines(
+                    f"{prefix}_fuzzy_match_seconds", ""
+                )
+            )
+        return "\n".join(lines) + "\n"
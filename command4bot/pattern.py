@@ -0,0 +1,121 @@
+import re
+from typing import Any, Dict, List, Match, Optional, Pattern, Tuple
+
+_INLINE_FLAGS = (
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+)
+
+# Global inline flags at the start, like ``(?i)``
+_GLOBAL_FLAGS = re.compile(r"^(?:\(\?[aiLmsux]+\))+")
+# Named groups and references to them, not preceded by an escape
+_NAMED = re.compile(r"(?<!\\)((?:\\\\)*)\(\?P(<|=)(\w+)(>|\))")
+# Numbered backreferences and conditionals, which merging would break
+_NUMBERED = re.compile(r"(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d)")
+
+
+def scoped_source(pattern: Pattern) -> str:
+    """Source of ``pattern`` keeping its flags when merged with others
+
+    :raises ValueError: If the pattern has flags which cannot be scoped
+    """
+    if pattern.flags & (re.ASCII | re.LOCALE):
+        raise ValueError(
+            f'Pattern "{pattern.pattern}" cannot be merged '
+            "because of ASCII or LOCALE flag"
+        )
+    # Global inline flags are only allowed at the start of the whole
+    # expression, and they are already in ``pattern.flags``
+    source = _GLOBAL_FLAGS.sub("", pattern.pattern)
+    flags = "".join(
+        letter for flag, letter in _INLINE_FLAGS if pattern.flags & flag
+    )
+    if not flags:
+        return source
+    if pattern.flags & re.VERBOSE:
+        # A trailing comment would swallow the closing parenthesis
+        source += "\n"
+    return f"(?{flags}:{source})"
+
+
+class PatternMatcher:
+    """Regular expressions merged into one for finding the matching one
+
+    Each pattern is an alternative of the merged expression, so searching
+    the input once finds the pattern matching at the leftmost position,
+    and the pattern inserted first among those matching there. Named groups
+    are renamed to be unique, and reported with their original names.
+    """
+
+    # alternative name -> (value, ((group name, renamed group), ...))
+    _entries: Dict[str, Tuple[Any, Tuple[Tuple[str, str], ...]]]
+    _alternatives: List[str]
+    # case sensitive -> merged expression
+    _compiled: Dict[bool, Pattern]
+
+    def __init__(self) -> None:
+        self._entries = {}
+        self._alternatives = []
+        self._compiled = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._alternatives)
+
+    def insert(self, pattern: Pattern, value: Any) -> None:
+        """Insert ``pattern`` associated with ``value``
+
+        :raises ValueError:
+            If the pattern has numbered backreferences or conditionals
+        """
+        if _NUMBERED.search(pattern.pattern):
+            raise ValueError(
+                f'Pattern "{pattern.pattern}" cannot be merged because of '
+                "numbered backreferences, use named groups instead"
+            )
+        name = f"_p{len(self._alternatives)}"
+
+        def rename(match: Match) -> str:
+            escapes, kind, group, end = match.groups()
+            return f"{escapes}(?P{kind}{name}_{group}{end}"
+
+        source = _NAMED.sub(rename, scoped_source(pattern))
+        groups = tuple(
+            (group, f"{name}_{group}") for group in pattern.groupindex
+        )
+        if set(re.compile(source).groupindex) != {new for _, new in groups}:
+            raise ValueError(
+                f'Pattern "{pattern.pattern}" cannot be merged '
+                "because of its named groups"
+            )
+        self._entries[name] = (value, groups)
+        self._alternatives.append(f"(?P<{name}>{source})")
+        self._compiled.clear()
+
+    def search(
+        self, content: str, case_sensitive: bool = True
+    ) -> Optional[Tuple[Any, Dict[str, str]]]:
+        """Find the pattern matching ``content``
+
+        :return:
+            (value, matched named groups) or ``None``.
+            Groups not taking part in the match are left out.
+        """
+        compiled = self._compiled.get(case_sensitive)
+        if compiled is None:
+            compiled = self._compiled[case_sensitive] = re.compile(
+                "|".join(self._alternatives),
+                0 if case_sensitive else re.IGNORECASE,
+            )
+        match = compiled.search(content)
+        if match is None:
+            return None
+        # The alternative closes after the groups inside it
+        value, groups = self._entries[match.lastgroup]  # type: ignore
+        captured = {}
+        for group, renamed in groups:
+            group_value = match.group(renamed)
+            if group_value is not None:
+                captured[group] = group_value
+        return value, captured
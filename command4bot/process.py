@@ -0,0 +1,147 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from inspect import isgenerator
+from multiprocessing.util import Finalize
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .command import Command
+    from .context import Context
+
+
+class ContextSpec(NamedTuple):
+    """What a worker process needs to create the value of a context"""
+
+    context_func: Callable
+    enable_cache: bool
+    ttl: Optional[float]
+    dependencies: Tuple[Tuple[str, "ContextSpec"], ...]
+
+    @classmethod
+    def from_context(cls, context: "Context") -> "ContextSpec":
+        return cls(
+            context.context_func,
+            context.enable_cache,
+            context.ttl,
+            tuple(
+                (dependency.name, cls.from_context(dependency))
+                for dependency in context.dependency_objects or ()
+            ),
+        )
+
+
+# Context values cached in a worker process,
+# context function -> (value, expiry time or None, generator)
+_worker_cache: Dict[Callable, Tuple[Any, Optional[float], Optional[Generator]]]
+_worker_cache = {}
+_worker_finalizer: Optional[Finalize] = None
+
+
+def _cleanup_worker_cache() -> None:
+    while _worker_cache:
+        _, (_, _, generator) = _worker_cache.popitem()
+        if generator is not None:
+            generator.close()
+
+
+def _resolve(spec: ContextSpec) -> Any:
+    global _worker_finalizer
+    entry = _worker_cache.get(spec.context_func)
+    if entry is not None:
+        if entry[1] is None or time.monotonic() < entry[1]:
+            return entry[0]
+        del _worker_cache[spec.context_func]
+        if entry[2] is not None:
+            entry[2].close()
+
+    result = spec.context_func(
+        **{
+            name: _resolve(dependency)
+            for name, dependency in spec.dependencies
+        }
+    )
+    generator = None
+    if isgenerator(result):
+        generator = result
+        result = next(generator)
+    if spec.enable_cache:
+        if _worker_finalizer is None:
+            # Run the rest of generators when the worker exits
+            _worker_finalizer = Finalize(
+                None, _cleanup_worker_cache, exitpriority=10
+            )
+        _worker_cache[spec.context_func] = (
+            result,
+            None if spec.ttl is None else time.monotonic() + spec.ttl,
+            generator,
+        )
+    return result
+
+
+def run_in_worker(
+    func: Callable,
+    payload_name: Optional[str],
+    payload: str,
+    kwargs: Dict[str, Any],
+    contexts: Tuple[Tuple[str, ContextSpec], ...],
+) -> Any:
+    """Call the handler in a worker process, creating contexts there"""
+    args = {name: _resolve(spec) for name, spec in contexts}
+    if payload_name is not None:
+        args[payload_name] = payload
+    args.update(kwargs)
+    return func(**args)
+
+
+def compile_process_invoker(
+    command: "Command",
+    context_objects: Sequence["Context"],
+    get_pool: Callable[[], ProcessPoolExecutor],
+    asynchronous: bool = False,
+) -> Callable[[str, Dict[str, Any], Sequence[Any]], Any]:
+    """Build an invoker of ``command`` which calls the handler in a process
+
+    Only the payload and the keyword arguments the handler takes are sent
+    to the worker process, and contexts are created and cached there.
+    The invoker waits for the result, or with ``asynchronous=True``,
+    returns an awaitable of it, which must be awaited in an event loop.
+    """
+    func = command.command_func
+    payload_name = command.payload_parameter
+    extra_names = tuple(
+        parameter
+        for parameter in command.parameters
+        if parameter not in command.contexts and parameter != payload_name
+    )
+    contexts = tuple(
+        (context.name, ContextSpec.from_context(context))
+        for context in context_objects
+    )
+
+    def invoke(
+        payload: str, kwargs: Dict[str, Any], context_values: Sequence[Any]
+    ) -> Any:
+        future = get_pool().submit(
+            run_in_worker,
+            func,
+            payload_name,
+            payload,
+            {name: kwargs[name] for name in extra_names if name in kwargs},
+            contexts,
+        )
+        if asynchronous:
+            return asyncio.wrap_future(future)
+        return future.result()
+
+    return invoke
@@ -0,0 +1,95 @@
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import LRUCache
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+RATE_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*\.?\d*)\s*([smhd])\s*$")
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse rates like ``"5/10s"``, ``"30/m"`` or ``"1000/h"``
+
+    :return: Number of calls and the period in seconds
+    :rtype: Tuple[int, float]
+    :raises ValueError: If the rate is malformed
+    """
+    match = RATE_PATTERN.match(rate)
+    if match is None or int(match.group(1)) < 1:
+        raise ValueError(
+            f'Invalid rate limit "{rate}", should be like "5/10s"'
+        )
+    calls, period, unit = match.groups()
+    period = float(period) if period else 1.0
+    if period <= 0:
+        raise ValueError(f'Invalid rate limit "{rate}", period must be > 0')
+    return int(calls), period * UNITS[unit]
+
+
+class RateLimiter:
+    """Token bucket rate limiter, with a bucket for each key
+
+    Each bucket holds at most ``calls`` tokens and gains ``calls`` tokens
+    every ``period``. A call takes one token, and is rejected if there is
+    none.
+
+    :param rate: Rate like ``"5/10s"``, see :func:`parse_rate`
+    :type rate: str
+    :param per:
+        The keyword argument of :meth:`CommandsManager.exec` to key buckets
+        on, defaults to ``None`` (one bucket for all calls)
+    :type per: Optional[str], optional
+    :param maxsize:
+        Maximum number of buckets to keep, the least recently used ones are
+        discarded, defaults to 4096
+    :type maxsize: int, optional
+    :raises ValueError: If ``maxsize`` is less than 1
+    """
+
+    calls: int
+    period: float
+    per: Optional[str]
+    _buckets: LRUCache
+
+    def __init__(
+        self, rate: str, per: Optional[str] = None, maxsize: int = 4096
+    ) -> None:
+        if maxsize < 1:
+            # No bucket would be kept, so every call would be allowed
+            raise ValueError(
+                "Maximum number of rate limit buckets should be >= 1, "
+                f"got {maxsize}"
+            )
+        self.calls, self.period = parse_rate(rate)
+        self.per = per
+        self._buckets = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    def allow(self, kwargs: Dict[str, Any]) -> bool:
+        """Take a token from the bucket of the call
+
+        :param kwargs: Keyword arguments passed to :meth:`CommandsManager.exec`
+        :type kwargs: Dict[str, Any]
+        :return: Whether the call is allowed
+        :rtype: bool
+        """
+        key = None if self.per is None else kwargs.get(self.per)
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last update time]
+            bucket: Optional[List[float]] = self._buckets.get(key)
+            if bucket is None:
+                self._buckets.set(key, [self.calls - 1.0, now])
+                return True
+            tokens = min(
+                self.calls,
+                bucket[0] + (now - bucket[1]) * self.calls / self.period,
+            )
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                return False
+            bucket[0] = tokens - 1
+            return True
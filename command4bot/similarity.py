@@ -0,0 +1,237 @@
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher, get_close_matches
+from heapq import heappush, heappushpop
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class BaseSimilarityIndex:
+    """Index of keywords to look up similar keywords for misspelled input
+
+    :param n: Maximum number of similar keywords to return, defaults to 3
+    :type n: int, optional
+    :param cutoff:
+        Keywords with :meth:`difflib.SequenceMatcher.ratio` lower than this
+        are ignored, defaults to 0.6
+    :type cutoff: float, optional
+    """
+
+    n: int
+    cutoff: float
+
+    def __init__(self, n: int = 3, cutoff: float = 0.6) -> None:
+        self.n = n
+        self.cutoff = cutoff
+
+    def add(self, keyword: str) -> None:
+        raise NotImplementedError
+
+    def search(self, keyword: str) -> List[str]:
+        """Find keywords similar to ``keyword``, the most similar first
+
+        :param keyword: The misspelled keyword
+        :type keyword: str
+        :return: Similar keywords
+        :rtype: List[str]
+        """
+        raise NotImplementedError
+
+
+class DifflibIndex(BaseSimilarityIndex):
+    """Compare with every keyword using :func:`difflib.get_close_matches`"""
+
+    _keywords: List[str]
+
+    def __init__(self, n: int = 3, cutoff: float = 0.6) -> None:
+        super().__init__(n, cutoff)
+        self._keywords = []
+
+    def add(self, keyword: str) -> None:
+        self._keywords.append(keyword)
+
+    def search(self, keyword: str) -> List[str]:
+        return get_close_matches(keyword, self._keywords, self.n, self.cutoff)
+
+
+class NGramIndex(BaseSimilarityIndex):
+    """Bitsets of keywords by character, scanned bit-parallel
+
+    :meth:`difflib.SequenceMatcher.ratio` never exceeds
+    :meth:`difflib.SequenceMatcher.quick_ratio`, which only counts the
+    characters both strings have. For each character and each number of
+    its occurrences, the index keeps a bitset of the keywords having it at
+    least that many times, one per keyword length. Adding up the bitsets
+    of the input's characters with bitwise operations, a machine word of
+    keywords at a time, finds every keyword whose quick ratio reaches
+    ``cutoff``, so no keyword :func:`difflib.get_close_matches` would
+    return is missed. The scan is still linear in the number of keywords
+    of lengths close enough to the input, but much cheaper per keyword
+    than :class:`DifflibIndex`.
+
+    The candidates are then compared with
+    :class:`difflib.SequenceMatcher` in descending order of quick ratio,
+    skipping those whose longest common subsequence with the input is too
+    short, and stopping once no remaining candidate can rank among the
+    ``n`` most similar. So the results are the same as
+    :func:`difflib.get_close_matches`, unless more than ``max_candidates``
+    keywords would have to be compared, in which case a more similar
+    keyword than those returned may be missed.
+
+    :param max_candidates:
+        Maximum number of keywords to compare with
+        :class:`difflib.SequenceMatcher` for each search, ``None`` for no
+        limit, defaults to 100
+    :type max_candidates: Optional[int], optional
+    """
+
+    max_candidates: Optional[int]
+    # keyword length -> keywords, positions are bits in the bitsets
+    _buckets: Dict[int, List[str]]
+    # (character, occurrence) -> keyword length -> bitset of keywords
+    _bitsets: Dict[Tuple[str, int], Dict[int, int]]
+    _keywords: Set[str]
+
+    def __init__(
+        self,
+        n: int = 3,
+        cutoff: float = 0.6,
+        max_candidates: Optional[int] = 100,
+    ) -> None:
+        super().__init__(n, cutoff)
+        self.max_candidates = max_candidates
+        self._buckets = defaultdict(list)
+        self._bitsets = defaultdict(lambda: defaultdict(int))
+        self._keywords = set()
+
+    @staticmethod
+    def _grams(keyword: str) -> List[Tuple[str, int]]:
+        return [
+            (char, occurrence)
+            for char, count in Counter(keyword).items()
+            for occurrence in range(count)
+        ]
+
+    def add(self, keyword: str) -> None:
+        if keyword in self._keywords:
+            return
+        self._keywords.add(keyword)
+        bucket = self._buckets[len(keyword)]
+        bit = 1 << len(bucket)
+        bucket.append(keyword)
+        for gram in self._grams(keyword):
+            self._bitsets[gram][len(keyword)] |= bit
+
+    def search(self, keyword: str) -> List[str]:
+        length = len(keyword)
+        grams = [
+            self._bitsets[gram]
+            for gram in self._grams(keyword)
+            if gram in self._bitsets
+        ]
+        # (quick ratio, keyword) of candidates
+        candidates: List[Tuple[float, str]] = []
+        for other_length, bucket in self._buckets.items():
+            total = length + other_length
+            # upper bound of SequenceMatcher.ratio
+            if 2.0 * min(length, other_length) / total < self.cutoff:
+                continue
+            # The fewest shared characters to reach cutoff in quick ratio
+            least = max(0, int(self.cutoff * total / 2))
+            while 2.0 * least / total < self.cutoff:
+                least += 1
+            counts = _count_bits(
+                [bitsets.get(other_length, 0) for bitsets in grams]
+            )
+            matched = _at_least(counts, least, (1 << len(bucket)) - 1)
+            while matched:
+                bit = matched & -matched
+                matched ^= bit
+                index = bit.bit_length() - 1
+                shared = sum(
+                    1 << i
+                    for i, count_bit in enumerate(counts)
+                    if count_bit >> index & 1
+                )
+                candidates.append((2.0 * shared / total, bucket[index]))
+        candidates.sort(reverse=True)
+
+        # Same as difflib.get_close_matches, comparing the candidates most
+        # likely to rank first
+        matcher = SequenceMatcher()
+        matcher.set_seq2(keyword)
+        positions = _positions(keyword)
+        scored: List[Tuple[float, str]] = []
+        compared = 0
+        for quick_ratio, candidate in candidates:
+            least_ratio = scored[0][0] if len(scored) == self.n else 0.0
+            if least_ratio > quick_ratio:
+                # No remaining candidate can outrank the n-th
+                break
+            # The matching blocks form a common subsequence, so the
+            # longest common subsequence gives a tighter upper bound
+            total = length + len(candidate)
+            bound = 2.0 * _lcs_length(positions, length, candidate) / total
+            if bound < self.cutoff or bound < least_ratio:
+                continue
+            if compared == self.max_candidates:
+                break
+            compared += 1
+            matcher.set_seq1(candidate)
+            ratio = matcher.ratio()
+            if ratio >= self.cutoff:
+                if len(scored) < self.n:
+                    heappush(scored, (ratio, candidate))
+                else:
+                    heappushpop(scored, (ratio, candidate))
+        return [candidate for _, candidate in sorted(scored, reverse=True)]
+
+
+def _positions(keyword: str) -> Dict[str, int]:
+    """Bitsets of the positions of each character in ``keyword``"""
+    positions: Dict[str, int] = defaultdict(int)
+    for i, char in enumerate(keyword):
+        positions[char] |= 1 << i
+    return positions
+
+
+def _lcs_length(positions: Dict[str, int], length: int, other: str) -> int:
+    """Length of the longest common subsequence, computed bit-parallel
+
+    ``positions`` and ``length`` are of the first string, see
+    :func:`_positions`.
+    """
+    mask = (1 << length) - 1
+    row = mask
+    for char in other:
+        matches = row & positions.get(char, 0)
+        row = ((row + matches) | (row - matches)) & mask
+    return length - bin(row).count("1")
+
+
+def _count_bits(bitsets: List[int]) -> List[int]:
+    """Add up bitsets bit by bit, into binary digits of the counts"""
+    counts: List[int] = []
+    for carry in bitsets:
+        for i, digit in enumerate(counts):
+            counts[i] = digit ^ carry
+            carry &= digit
+            if not carry:
+                break
+        else:
+            if carry:
+                counts.append(carry)
+    return counts
+
+
+def _at_least(counts: List[int], least: int, mask: int) -> int:
+    """Bitset of the counts of :func:`_count_bits` not below ``least``"""
+    if least >> len(counts):
+        return 0
+    greater = 0
+    equal = mask
+    for i in reversed(range(len(counts))):
+        if least >> i & 1:
+            equal &= counts[i]
+        else:
+            greater |= equal & counts[i]
+            equal &= ~counts[i]
+    return greater | equal
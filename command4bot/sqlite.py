@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from .command import CommandRegistry
+from .similarity import BaseSimilarityIndex
+
+
+class SQLiteCommandRegistry(CommandRegistry):
+    """Command registry sharing status through a SQLite database
+
+    Processes using the same database file see each other's
+    :meth:`CommandsManager.open` and :meth:`CommandsManager.close`
+    after calling :meth:`CommandsManager.sync_status`. Status is read from
+    a local copy, and the database is only read again if its version
+    changes. The database is in WAL mode, so that reading does not block
+    writing.
+
+    :param path: Path of the database file
+    :type path: str
+    :param timeout:
+        Seconds to wait for other processes writing,
+        defaults to 5.0
+    :type timeout: float, optional
+
+    For other parameters, see :class:`BaseCommandRegistry`.
+    """
+
+    path: str
+    synced_version: int
+
+    def __init__(
+        self,
+        path: str,
+        similarity_index: BaseSimilarityIndex = None,
+        trie: bool = False,
+        timeout: float = 5.0,
+    ):
+        super().__init__(similarity_index, trie)
+        self.path = path
+        # Version of the database the local copy is synced to
+        self.synced_version = -1
+        self._writing = True
+        self._lock = threading.Lock()
+        # Transactions are managed explicitly
+        self._conn = sqlite3.connect(
+            path,
+            timeout=timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS command_status "
+                "(name TEXT PRIMARY KEY, status INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS command_status_version "
+                "(id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "version INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO command_status_version VALUES (0, 0)"
+            )
+
+    def set_status(self, name: str, status: bool) -> None:
+        super().set_status(name, status)
+        if not self._writing:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO command_status VALUES (?, ?)",
+                    (name, int(status)),
+                )
+                (version,) = self._conn.execute(
+                    "SELECT version FROM command_status_version"
+                ).fetchone()
+                self._conn.execute(
+                    "UPDATE command_status_version SET version = ?",
+                    (version + 1,),
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            # Nothing else changed since the last sync
+            if version == self.synced_version:
+                self.synced_version = version + 1
+
+    def read_version(self) -> int:
+        """Read the version of the database, increased on every change"""
+        with self._lock:
+            (version,) = self._conn.execute(
+                "SELECT version FROM command_status_version"
+            ).fetchone()
+        return version
+
+    def pull_status_diff(self) -> Dict[str, bool]:
+        if self.read_version() == self.synced_version:
+            return {}
+        with self._lock:
+            # Read the version and the status from the same snapshot
+            self._conn.execute("BEGIN")
+            try:
+                (version,) = self._conn.execute(
+                    "SELECT version FROM command_status_version"
+                ).fetchone()
+                rows = self._conn.execute(
+                    "SELECT name, status FROM command_status"
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        self.synced_version = version
+        return self.calc_status_diff(
+            {name: bool(status) for name, status in rows}
+        )
+
+    @contextmanager
+    def applying_pulled(self) -> Iterator[None]:
+        self._writing = False
+        try:
+            yield
+        finally:
+            self._writing = True
+
+    def close_connection(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
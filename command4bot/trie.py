@@ -0,0 +1,76 @@
+from typing import Any, Dict, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ("children", "value", "prefix")
+
+    children: Dict[str, "_Node"]
+    value: Any
+    prefix: bool
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.value = None
+        self.prefix = False
+
+
+class KeywordTrie:
+    """Character trie of keywords for longest-keyword matching
+
+    Keywords may contain spaces, e.g. ``"admin ban"``. A keyword matches
+    only if followed by a space or the end of input, unless it is inserted
+    with ``prefix=True``, in which case it matches any input starting with
+    it, e.g. ``"/r"`` matches ``"/r123"``.
+    """
+
+    _root: _Node
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def insert(self, keyword: str, value: Any, prefix: bool = False) -> None:
+        """Insert ``keyword`` associated with ``value``
+
+        :raises ValueError: If the keyword is empty
+        """
+        if not keyword:
+            raise ValueError("Cannot insert empty keyword")
+        node = self._root
+        for char in keyword:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+        node.value = value
+        node.prefix = prefix
+
+    def longest_match(
+        self, content: str, case_sensitive: bool = True
+    ) -> Optional[Tuple[Any, int]]:
+        """Find the longest keyword matching the start of ``content``
+
+        The cost is proportional to the length of the matched keyword,
+        not the number of keywords.
+
+        :param content: text input
+        :type content: str
+        :param case_sensitive:
+            If ``False``, ``content`` is lowercased while matching,
+            so the keywords should be inserted lowercased
+        :type case_sensitive: bool, optional
+        :return: Value of the keyword and where the keyword ends in
+            ``content``, or ``None`` if no keyword matches
+        :rtype: Optional[Tuple[Any, int]]
+        """
+        node = self._root
+        match = None
+        for i, char in enumerate(content):
+            if node.value is not None and (node.prefix or char == " "):
+                match = (node.value, i)
+            for folded in char if case_sensitive else char.lower():
+                node = node.children.get(folded)  # type: ignore
+                if node is None:
+                    return match
+        if node.value is not None:
+            match = (node.value, len(content))
+        return match
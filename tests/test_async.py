@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAsyncCommand:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(command_context_ignore=["user"])
+
+        @mgr.context
+        async def name():
+            await asyncio.sleep(0)
+            return "Jack"
+
+        @mgr.context
+        def greeting():
+            return "Hi"
+
+        @mgr.command
+        async def hello(payload, name, greeting):
+            await asyncio.sleep(0)
+            return f"{greeting} {payload}, I am {name}"
+
+        @mgr.command
+        def whoami(user):
+            return user
+
+        return mgr
+
+    def test_coroutine_command(self, mgr: CommandsManager):
+        assert run(mgr.aexec("hello Bob")) == "Hi Bob, I am Jack"
+
+    def test_sync_command(self, mgr: CommandsManager):
+        assert run(mgr.aexec("whoami", user="Alex")) == "Alex"
+
+    def test_async_context_in_sync_exec(self, mgr: CommandsManager):
+        mgr.context_reg.get("name").cleanup()
+        with pytest.raises(TypeError):
+            mgr.exec("hello Bob")
+
+
+class TestAsyncGeneratorContext:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.open_count = 0
+        data_share.status = None
+
+        @mgr.context
+        async def data():
+            await asyncio.sleep(0.01)
+            data_share.open_count += 1
+            data_share.status = "pending"
+            yield "abc"
+            await asyncio.sleep(0)
+            data_share.status = "done"
+
+        @mgr.command
+        def post(data):
+            return data
+
+        return mgr
+
+    def test_initialized_once(self, mgr: CommandsManager, data_share):
+        async def main():
+            return await asyncio.gather(
+                *(mgr.aexec("post") for _ in range(10))
+            )
+
+        assert run(main()) == ["abc"] * 10
+        assert data_share.open_count == 1
+        assert data_share.status == "pending"
+
+    def test_cleanup_without_loop(self, mgr: CommandsManager, data_share):
+        mgr.close("post")
+        assert data_share.status == "done"
+        assert not mgr.context_reg.get("data").is_cached
+
+    def test_cleanup_in_loop(self, mgr: CommandsManager, data_share):
+        async def main():
+            mgr.open("post")
+            assert await mgr.aexec("post") == "abc"
+            mgr.close("post")
+            await asyncio.sleep(0.01)
+
+        run(main())
+        assert data_share.open_count == 2
+        assert data_share.status == "done"
+
+    def test_another_loop(self, mgr: CommandsManager, data_share):
+        async def main():
+            mgr.open("post")
+            return await asyncio.gather(
+                *(mgr.aexec("post") for _ in range(10))
+            )
+
+        # The lock of the context was created in the loops of earlier tests
+        assert run(main()) == ["abc"] * 10
+        assert data_share.open_count == 3
+        mgr.close("post")
+
+
+class TestAsyncFallback:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(enable_default_fallback=False)
+
+        @mgr.fallback(priority=10)
+        async def skip(content):
+            return None
+
+        @mgr.fallback(priority=5)
+        async def echo(content):
+            return f"echo {content}"
+
+        return mgr
+
+    def test_fallback_awaited(self, mgr: CommandsManager):
+        assert run(mgr.aexec("nothing")) == "echo nothing"
@@ -99,3 +99,39 @@ class TestContextExecuteOnce:
     def test_cleanup_once(self, mgr: CommandsManager, close_post, data_share):
         assert len(data_share.close_count) == 1
         assert not mgr.context_reg.get("data").is_cached
+
+
+class TestLockFreeRead:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager()
+
+        @mgr.context
+        def data():
+            return "abc"
+
+        @mgr.command
+        def post(data):
+            return data
+
+        mgr.exec("post")
+        return mgr
+
+    def test_cached_read_without_lock(self, mgr: CommandsManager):
+        context = mgr.context_reg.get("data")
+        results = []
+        with context._Context__lock:  # type: ignore
+            thread = threading.Thread(
+                target=lambda: results.append(mgr.exec("post"))
+            )
+            thread.start()
+            thread.join(1)
+            assert results == ["abc"]
+
+    def test_read_after_cleanup(self, mgr: CommandsManager):
+        context = mgr.context_reg.get("data")
+        context.cleanup()
+        assert not context.is_cached
+        assert context.cached_value is None
+        assert mgr.exec("post") == "abc"
+        assert context.is_cached
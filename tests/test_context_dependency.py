@@ -0,0 +1,133 @@
+import pytest
+
+from command4bot import CommandsManager
+
+
+class TestDependency:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.events = []
+
+        @mgr.context
+        def db_session(db_engine, config):
+            data_share.events.append("open session")
+            yield f"session({db_engine}, {config})"
+            data_share.events.append("close session")
+
+        @mgr.context
+        def db_engine(config):
+            data_share.events.append("open engine")
+            yield f"engine({config})"
+            data_share.events.append("close engine")
+
+        @mgr.context
+        def config():
+            data_share.events.append("load config")
+            return "cfg"
+
+        @mgr.command
+        def query(db_session):
+            return db_session
+
+        @mgr.command
+        def show_config(config):
+            return config
+
+        return mgr
+
+    def test_lazy(self, mgr: CommandsManager, data_share):
+        assert data_share.events == []
+
+    def test_transitive_reference(self, mgr: CommandsManager):
+        assert mgr.context_reg.get("db_session").reference_count == 1
+        assert mgr.context_reg.get("db_engine").reference_count == 1
+        # show_config and db_session and db_engine
+        assert mgr.context_reg.get("config").reference_count == 3
+
+    def test_dependency_order(self, mgr: CommandsManager, data_share):
+        assert mgr.exec("query") == "session(engine(cfg), cfg)"
+        assert data_share.events == [
+            "load config",
+            "open engine",
+            "open session",
+        ]
+        assert mgr.exec("query") == "session(engine(cfg), cfg)"
+        assert len(data_share.events) == 3
+
+    def test_release_subtree(self, mgr: CommandsManager, data_share):
+        mgr.close("query")
+        assert data_share.events[3:] == ["close session", "close engine"]
+        assert mgr.context_reg.get("db_engine").reference_count == 0
+        assert mgr.context_reg.get("config").reference_count == 1
+        assert mgr.context_reg.get("config").is_cached
+        mgr.close("show_config")
+        assert mgr.context_reg.get("config").reference_count == 0
+        assert not mgr.context_reg.get("config").is_cached
+
+    def test_reopen(self, mgr: CommandsManager, data_share):
+        mgr.open("query")
+        assert mgr.context_reg.get("config").reference_count == 2
+        assert mgr.exec("query") == "session(engine(cfg), cfg)"
+
+
+class TestInvalidDependency:
+    def test_cycle(self):
+        mgr = CommandsManager()
+
+        @mgr.context
+        def a(b):
+            pass
+
+        @mgr.context
+        def b(c):
+            pass
+
+        with pytest.raises(ValueError) as e_info:
+
+            @mgr.context
+            def c(a):
+                pass
+
+        assert "circular" in e_info.value.args[0].lower()
+
+    def test_self_cycle(self):
+        mgr = CommandsManager()
+
+        with pytest.raises(ValueError):
+
+            @mgr.context
+            def a(a):
+                pass
+
+    def test_unknown_dependency(self):
+        mgr = CommandsManager()
+
+        @mgr.context
+        def a(missing):
+            pass
+
+        with pytest.raises(ValueError) as e_info:
+
+            @mgr.command
+            def cmd(a):
+                pass
+
+        assert "missing" in e_info.value.args[0]
+
+    def test_pooled_dependency(self):
+        mgr = CommandsManager()
+
+        @mgr.context(scope="pool", size=1)
+        def conn():
+            pass
+
+        @mgr.context
+        def repo(conn):
+            pass
+
+        with pytest.raises(ValueError):
+
+            @mgr.command
+            def cmd(repo):
+                pass
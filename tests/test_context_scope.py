@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+class TestThreadScope:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.closed = []
+
+        @mgr.context(scope="thread")
+        def conn():
+            value = threading.get_ident()
+            yield value
+            data_share.closed.append(value)
+
+        @mgr.command
+        def whoami(conn):
+            return conn
+
+        return mgr
+
+    def test_per_thread(self, mgr: CommandsManager):
+        results = []
+
+        def target():
+            results.append((threading.get_ident(), mgr.exec("whoami")))
+            results.append((threading.get_ident(), mgr.exec("whoami")))
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(ident == value for ident, value in results)
+        assert mgr.exec("whoami") == threading.get_ident()
+
+    def test_cleanup_all(self, mgr: CommandsManager, data_share):
+        mgr.close("whoami")
+        assert len(data_share.closed) == 4
+
+
+class TestPoolScope:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.created = 0
+        data_share.closed = 0
+        data_share.in_use = set()
+        data_share.max_in_use = 0
+        data_share.lock = threading.Lock()
+
+        @mgr.context(scope="pool", size=2)
+        def parser():
+            with data_share.lock:
+                data_share.created += 1
+                value = data_share.created
+            yield value
+            data_share.closed += 1
+
+        @mgr.command
+        def parse(parser):
+            with data_share.lock:
+                assert parser not in data_share.in_use
+                data_share.in_use.add(parser)
+                data_share.max_in_use = max(
+                    data_share.max_in_use, len(data_share.in_use)
+                )
+            time.sleep(0.01)
+            with data_share.lock:
+                data_share.in_use.remove(parser)
+            return parser
+
+        return mgr
+
+    def test_bounded(self, mgr: CommandsManager, data_share):
+        threads = [
+            threading.Thread(target=lambda: mgr.exec("parse"))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert data_share.created == 2
+        assert data_share.max_in_use == 2
+
+    def test_exec_many(self, mgr: CommandsManager, data_share):
+        assert set(mgr.exec_many(["parse"] * 3)) <= {1, 2}
+
+    def test_aexec(self, mgr: CommandsManager, data_share):
+        async def main():
+            return await asyncio.gather(
+                *(mgr.aexec("parse") for _ in range(4))
+            )
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert set(loop.run_until_complete(main())) <= {1, 2}
+        finally:
+            loop.close()
+        assert data_share.created == 2
+
+    def test_cleanup(self, mgr: CommandsManager, data_share):
+        mgr.close("parse")
+        assert data_share.closed == 2
+
+    def test_reopen(self, mgr: CommandsManager, data_share):
+        mgr.open("parse")
+        assert mgr.exec("parse") == 3
+
+
+def test_cleanup_while_checked_out():
+    mgr = CommandsManager()
+    closed = []
+    started = threading.Event()
+    finish = threading.Event()
+
+    @mgr.context(scope="pool", size=1)
+    def conn():
+        yield "conn"
+        closed.append("conn")
+
+    @mgr.command
+    def slow(conn):
+        started.set()
+        finish.wait(2)
+        return conn
+
+    thread = threading.Thread(target=lambda: mgr.exec("slow"))
+    thread.start()
+    started.wait(2)
+    mgr.close("slow")
+    assert closed == []
+    finish.set()
+    thread.join()
+    assert closed == ["conn"]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(scope="global"),
+        dict(scope="pool"),
+        dict(scope="pool", size=0),
+        dict(scope="thread", ttl=1),
+        dict(scope="pool", size=1, enable_cache=False),
+    ],
+)
+def test_invalid_options(options):
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.context(**options)
+        def conn():
+            pass
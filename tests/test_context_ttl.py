@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:  # pragma: no cover
+            raise TimeoutError
+        time.sleep(0.005)
+
+
+class TestSyncRefresh:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.created = 0
+        data_share.cleaned = 0
+
+        @mgr.context(ttl=0.05)
+        def token():
+            data_share.created += 1
+            yield data_share.created
+            data_share.cleaned += 1
+
+        @mgr.command
+        def show(token):
+            return token
+
+        return mgr
+
+    def test_cached_within_ttl(self, mgr: CommandsManager, data_share):
+        assert mgr.exec("show") == 1
+        assert mgr.exec("show") == 1
+
+    def test_refresh_after_ttl(self, mgr: CommandsManager, data_share):
+        time.sleep(0.06)
+        assert mgr.exec("show") == 2
+        assert data_share.cleaned == 1
+
+    def test_invalidate(self, mgr: CommandsManager, data_share):
+        mgr.invalidate("token")
+        assert mgr.exec("show") == 3
+        assert data_share.cleaned == 2
+
+
+class TestBackgroundRefresh:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.created = 0
+        data_share.cleaned = []
+        data_share.release = threading.Event()
+
+        @mgr.context(ttl=0.05, refresh="background")
+        def token():
+            data_share.created += 1
+            if data_share.created > 1:
+                data_share.release.wait(2)
+            value = data_share.created
+            yield value
+            data_share.cleaned.append(value)
+
+        @mgr.command
+        def show(token):
+            return token
+
+        return mgr
+
+    def test_stale_while_revalidate(self, mgr: CommandsManager, data_share):
+        assert mgr.exec("show") == 1
+        time.sleep(0.06)
+        # stale value served, single refresh in flight
+        assert mgr.exec("show") == 1
+        assert mgr.exec("show") == 1
+        wait_for(lambda: data_share.created == 2)
+        data_share.release.set()
+        wait_for(lambda: mgr.exec("show") == 2)
+        assert data_share.created == 2
+        assert data_share.cleaned == [1]
+
+    def test_invalidate(self, mgr: CommandsManager, data_share):
+        mgr.invalidate("token")
+        wait_for(lambda: mgr.exec("show") == 3)
+        assert data_share.cleaned == [1, 2]
+
+    def test_cleanup(self, mgr: CommandsManager, data_share):
+        mgr.close("show")
+        assert data_share.cleaned == [1, 2, 3]
+
+
+def test_async_background_refresh():
+    mgr = CommandsManager()
+    created = []
+
+    @mgr.context(ttl=0.01, refresh="background")
+    async def token():
+        created.append(len(created) + 1)
+        return created[-1]
+
+    @mgr.command
+    def show(token):
+        return token
+
+    async def main():
+        assert await mgr.aexec("show") == 1
+        await asyncio.sleep(0.02)
+        assert await mgr.aexec("show") == 1
+        await asyncio.sleep(0)
+        assert await mgr.aexec("show") == 2
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def test_unknown_refresh_mode():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.context(refresh="lazy")
+        def token():
+            pass
@@ -0,0 +1,69 @@
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+
+
+class TestExecMany:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(
+            command_context_ignore=["user"], command_case_sensitive=False
+        )
+        data_share.context_calls = 0
+        data_share.lookups = []
+
+        get = mgr.command_reg.get
+
+        def counted_get(keyword):
+            data_share.lookups.append(keyword)
+            return get(keyword)
+
+        mgr.command_reg.get = counted_get  # type: ignore
+
+        @mgr.context(enable_cache=False)
+        def name():
+            data_share.context_calls += 1
+            return "Jack"
+
+        @mgr.command
+        def echo(payload, name, user):
+            return f"{name} tells {user} {payload}"
+
+        @mgr.command
+        @mgr.command_reg.mark_default_closed
+        def hidden():
+            return "You found me"
+
+        @mgr.fallback
+        def unknown(content, user):
+            return f"{user} said {content}"
+
+        return mgr
+
+    @pytest.fixture(scope="class")
+    def results(self, mgr: CommandsManager, data_share):
+        data_share.lookups.clear()
+        return mgr.exec_many(
+            ["echo a", "ECHO b", "hidden", "what", "echo c", "hidden"],
+            user="Bob",
+        )
+
+    def test_results_in_order(self, results):
+        assert results == [
+            "Jack tells Bob a",
+            "Jack tells Bob b",
+            DEFAULT_CONFIG["text_command_closed"],
+            "Bob said what",
+            "Jack tells Bob c",
+            DEFAULT_CONFIG["text_command_closed"],
+        ]
+
+    def test_lookup_once_per_keyword(self, results, data_share):
+        assert sorted(data_share.lookups) == ["echo", "echo", "hidden", "what"]
+
+    def test_context_once_per_batch(self, results, data_share):
+        assert data_share.context_calls == 1
+
+    def test_empty(self, mgr: CommandsManager):
+        assert mgr.exec_many([]) == []
@@ -1,6 +1,9 @@
+import asyncio
+import re
+
 import pytest
 
-from command4bot import CommandsManager
+from command4bot import CommandsManager, FallbackRegistry
 
 
 class TestFallback:
@@ -106,3 +109,75 @@ class TestFallbackKw:
     def test_forgot_kw(self, mgr: CommandsManager):
         with pytest.raises(TypeError):
             mgr.exec("nothing")
+
+
+class TestFallbackGuard:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(config=dict(enable_default_fallback=False))
+        data_share.calls = []
+
+        def make(name):
+            def fallback(content, **kwargs):
+                data_share.calls.append(name)
+
+            return fallback
+
+        mgr.fallback(make("url"), pattern=r"https?://")
+        mgr.fallback(make("dice"), pattern=r"^\d+d\d+$", priority=20)
+        mgr.fallback(make("shout"), pattern=re.compile("hey", re.I))
+        mgr.fallback(make("repeat"), pattern=r"(\w)\1{3}")
+        mgr.fallback(make("slash"), prefix=["/", "!"], max_length=10)
+        mgr.fallback(make("image"), content_type="image", priority=5)
+        mgr.fallback(make("long"), min_length=20, priority=0)
+        mgr.fallback(make("always"), priority=-5)
+        return mgr
+
+    @pytest.mark.parametrize(
+        "content,kwargs,calls",
+        [
+            ("hello", {}, ["always"]),
+            ("2d6", {}, ["dice", "always"]),
+            ("see https://example.com", {}, ["url", "long", "always"]),
+            ("HEY", {}, ["shout", "always"]),
+            ("zzzz", {}, ["repeat", "always"]),
+            ("/help", {}, ["slash", "always"]),
+            ("!help me please", {}, ["always"]),
+            ("cat", {"content_type": "image"}, ["image", "always"]),
+            ("cat", {"content_type": "text"}, ["always"]),
+        ],
+    )
+    def test_candidates(self, mgr, data_share, content, kwargs, calls):
+        data_share.calls = []
+        assert mgr.exec(content, **kwargs) is None
+        assert data_share.calls == calls
+
+    def test_aexec(self, mgr, data_share):
+        data_share.calls = []
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(mgr.aexec("hey http://a"))
+        loop.close()
+        assert data_share.calls == ["url", "shout", "always"]
+
+
+def test_unguarded_candidates():
+    reg = FallbackRegistry()
+    reg.register(str, 1)
+    reg.register(repr, 2)
+    assert reg.candidates("anything") == [repr, str]
+
+
+def test_inline_flag_guards():
+    mgr = CommandsManager(config=dict(enable_default_fallback=False))
+
+    @mgr.fallback(pattern="(?i)hey")
+    def hey(content):
+        return "hey"
+
+    @mgr.fallback(pattern=re.compile(r"\d+", re.ASCII), priority=5)
+    def number(content):
+        return "number"
+
+    assert mgr.exec("HEY") == "hey"
+    assert mgr.exec("42") == "number"
+    assert mgr.exec("hello") is None
@@ -0,0 +1,99 @@
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.cache import LRUCache
+from command4bot.manager import DEFAULT_CONFIG
+
+
+class TestHelpCache:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.lookups = 0
+
+        get_similar_commands = mgr.command_reg.get_similar_commands
+
+        def counted(keyword):
+            data_share.lookups += 1
+            return get_similar_commands(keyword)
+
+        mgr.command_reg.get_similar_commands = counted  # type: ignore
+
+        @mgr.command(groups=["greet"])
+        def world():
+            "Say world"
+            return "world"
+
+        @mgr.command
+        def hello():
+            "Say hello"
+            return "hello"
+
+        return mgr
+
+    def test_cached(self, mgr: CommandsManager, data_share):
+        expected = DEFAULT_CONFIG["text_possible_command"] + "\n- Say world"
+        assert mgr.exec("word") == expected
+        assert mgr.exec("word payload") == expected
+        assert data_share.lookups == 1
+        assert mgr.help_cache.hits == 1
+        assert mgr.help_cache.misses == 1
+
+    def test_unrelated_status_change(self, mgr: CommandsManager, data_share):
+        mgr.open("greet")  # already open
+        mgr.exec("word")
+        assert data_share.lookups == 1
+
+    def test_invalidate_on_close(self, mgr: CommandsManager, data_share):
+        mgr.close("greet")
+        assert mgr.exec("word") == DEFAULT_CONFIG["text_general_response"]
+        assert data_share.lookups == 2
+
+    def test_invalidate_on_batch(self, mgr: CommandsManager, data_share):
+        mgr.batch_update_status({"greet": True})
+        assert mgr.exec("word").endswith("- Say world")
+        assert data_share.lookups == 3
+
+    def test_invalidate_on_register(self, mgr: CommandsManager, data_share):
+        @mgr.command
+        def word():
+            return "word"
+
+        mgr.exec("wor")
+        assert data_share.lookups == 4
+
+
+class TestLRUCache:
+    def test_evict_least_recent(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        assert "b" not in cache
+        assert len(cache) == 2
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+        assert cache.misses == 1
+
+    def test_outdated_generation(self):
+        cache = LRUCache()
+        generation = cache.generation
+        cache.clear()
+        cache.set("a", 1, generation)
+        assert "a" not in cache
+
+    def test_ttl(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr("command4bot.cache.time.monotonic", lambda: now[0])
+        cache = LRUCache(ttl=10)
+        cache.set("a", 1)
+        now[0] = 9.0
+        assert cache.get("a") == 1
+        now[0] = 10.0
+        assert cache.get("a") is None
+        assert "a" not in cache
+        assert cache.misses == 1
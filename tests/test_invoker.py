@@ -0,0 +1,66 @@
+import pytest
+
+from command4bot import Command, CommandsManager
+
+
+class TestInvoker:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(
+            command_context_ignore=["user", "channel"],
+            command_payload_parameter="text",
+        )
+
+        @mgr.context
+        def name():
+            return "Jack"
+
+        @mgr.command
+        def echo(text, name, user="nobody", *, channel="general"):
+            return f"{name} tells {user} {text} in {channel}"
+
+        @mgr.command
+        def ping():
+            return "pong"
+
+        @mgr.command
+        def repeat(text):
+            return text * 2
+
+        return mgr
+
+    def test_custom_payload_parameter(self, mgr: CommandsManager):
+        assert mgr.exec("repeat ab") == "abab"
+
+    def test_extra_kwargs(self, mgr: CommandsManager):
+        assert (
+            mgr.exec("echo hi", user="Bob", channel="dev", unused=1)
+            == "Jack tells Bob hi in dev"
+        )
+
+    def test_missing_kwargs_use_default(self, mgr: CommandsManager):
+        assert mgr.exec("echo hi") == "Jack tells nobody hi in general"
+
+    def test_context_not_overridden(self, mgr: CommandsManager):
+        assert mgr.exec("echo hi", name="Tom") == (
+            "Jack tells nobody hi in general"
+        )
+
+    def test_no_parameters(self, mgr: CommandsManager):
+        assert mgr.exec("ping", user="Bob") == "pong"
+
+
+def test_invoke_directly():
+    def greet(payload, name):
+        return f"{name}: {payload}"
+
+    command = Command(
+        greet,
+        keywords=["greet"],
+        groups=[],
+        parameter_ignore=(),
+        context_ignore=(),
+        payload_parameter="payload",
+    )
+    assert command.contexts == ["name"]
+    assert command.invoke("hi", {}, ["Jack"]) == "Jack: hi"
@@ -0,0 +1,126 @@
+import asyncio
+import sys
+import textwrap
+
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+
+PLUGIN = '''
+def forecast(payload, weather_api):
+    """Weather forecast
+
+    Usage: forecast <city>
+    """
+    return f"{weather_api} says {payload} is sunny"
+
+
+def rain():
+    return "rain"
+
+
+class Commands:
+    @staticmethod
+    def snow():
+        "Let it snow"
+        return "snow"
+'''
+
+
+@pytest.fixture()
+def plugin(tmp_path, monkeypatch):
+    name = f"lazy_plugin_{id(tmp_path)}"
+    (tmp_path / f"{name}.py").write_text(textwrap.dedent(PLUGIN))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+
+
+@pytest.fixture()
+def mgr(plugin):
+    mgr = CommandsManager()
+
+    @mgr.context
+    def weather_api():
+        return "API"
+
+    mgr.lazy_command(f"{plugin}:forecast", groups=["weather"])
+    mgr.lazy_command(
+        f"{plugin}:rain", groups=["weather"], help="Is it raining?"
+    )
+    mgr.lazy_command(f"{plugin}:Commands.snow", keywords=["snowing"])
+    return mgr
+
+
+def test_not_imported_on_register(mgr: CommandsManager, plugin):
+    assert plugin not in sys.modules
+    assert mgr.context_reg.get("weather_api").reference_count == 0
+
+
+def test_import_on_exec(mgr: CommandsManager, plugin):
+    assert mgr.exec("forecast Paris") == "API says Paris is sunny"
+    assert plugin in sys.modules
+    assert mgr.context_reg.get("weather_api").reference_count == 1
+    assert mgr.exec("snowing") == "snow"
+
+
+def test_closed_not_imported(mgr: CommandsManager, plugin):
+    mgr.close("weather")
+    assert mgr.exec("forecast") == DEFAULT_CONFIG["text_command_closed"]
+    assert plugin not in sys.modules
+    assert mgr.context_reg.get("weather_api").reference_count == 0
+
+
+def test_import_on_open(mgr: CommandsManager, plugin):
+    mgr.close("weather")
+    mgr.open("weather")
+    assert plugin in sys.modules
+    assert mgr.context_reg.get("weather_api").reference_count == 1
+    mgr.close("weather")
+    assert mgr.context_reg.get("weather_api").reference_count == 0
+
+
+def test_failed_import_on_open(plugin):
+    mgr = CommandsManager()
+
+    @mgr.context
+    def weather_api():
+        return "API"
+
+    mgr.lazy_command("lazy_plugin_missing:hail", groups=["weather"])
+    mgr.lazy_command(f"{plugin}:forecast", groups=["weather"])
+    mgr.close("weather")
+    with pytest.raises(ModuleNotFoundError):
+        mgr.open("weather")
+    # Commands after the failed one are still referenced
+    assert mgr.context_reg.get("weather_api").reference_count == 1
+    assert mgr.exec("forecast Paris") == "API says Paris is sunny"
+    mgr.close("weather")
+    assert mgr.context_reg.get("weather_api").reference_count == 0
+
+
+def test_declared_help(mgr: CommandsManager, plugin):
+    assert mgr.get_possible_keywords_help("rainn") == ["- Is it raining?"]
+    assert plugin not in sys.modules
+
+
+def test_lazy_help(mgr: CommandsManager, plugin):
+    command = mgr.command_reg.get("forecast")
+    assert command.brief_help == "- Weather forecast"
+    assert command.help.endswith("Usage: forecast <city>")
+
+
+def test_exec_many_and_aexec(mgr: CommandsManager):
+    assert mgr.exec_many(["rain", "rain"]) == ["rain", "rain"]
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(mgr.aexec("snowing")) == "snow"
+    finally:
+        loop.close()
+
+
+def test_bad_import_path():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+        mgr.lazy_command("no_colon")
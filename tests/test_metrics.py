@@ -0,0 +1,129 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.metrics import BUCKETS, Histogram
+
+
+class TestHistogram:
+    def test_empty(self):
+        assert Histogram().quantile(0.5) is None
+
+    def test_quantile(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.observe(1e-6)
+        histogram.observe(1)
+        assert histogram.quantile(0.5) <= 1e-6
+        assert histogram.quantile(0.99) <= 1e-6
+        assert 0.5 < histogram.quantile(1) <= 1.1
+
+    def test_overflow(self):
+        histogram = Histogram()
+        histogram.observe(1e6)
+        assert histogram.quantile(0.5) == BUCKETS[-1]
+
+
+class TestMetrics:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(enable_metrics=True)
+
+        @mgr.context
+        def resource():
+            yield "resource"
+
+        @mgr.command
+        def hello(resource):
+            return resource
+
+        @mgr.command
+        def fail():
+            raise RuntimeError
+
+        @mgr.command
+        async def later(payload):
+            return payload
+
+        @mgr.fallback
+        def echo(content):
+            if content.startswith("echo"):
+                return content
+
+        return mgr
+
+    def test_command(self, mgr: CommandsManager):
+        assert mgr.exec("hello") == "resource"
+        assert mgr.exec_many(["hello", "hello"]) == ["resource"] * 2
+        stats = mgr.stats()["commands"]["hello"]
+        assert stats["calls"] == 3
+        assert stats["errors"] == 0
+        assert stats["p50"] is not None
+
+    def test_error(self, mgr: CommandsManager):
+        with pytest.raises(RuntimeError):
+            mgr.exec("fail")
+        assert mgr.stats()["commands"]["fail"]["errors"] == 1
+
+    def test_async(self, mgr: CommandsManager):
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(mgr.aexec("later x")) == "x"
+        loop.close()
+        assert mgr.stats()["commands"]["later"]["calls"] == 1
+
+    def test_context(self, mgr: CommandsManager):
+        mgr.close("hello")
+        stats = mgr.stats()["contexts"]["resource"]
+        assert stats["init"]["count"] == 1
+        assert stats["cleanup"]["count"] == 1
+
+    def test_fallback(self, mgr: CommandsManager):
+        mgr.exec("echo hi")
+        mgr.exec("hellp")
+        stats = mgr.stats()
+        assert stats["fallbacks"] == {"echo": 1, "help_with_similar": 1}
+        assert stats["fuzzy_match"]["count"] == 1
+
+    def test_prometheus(self, mgr: CommandsManager):
+        text = mgr.export_prometheus()
+        assert 'command4bot_command_calls_total{command="hello"} 3' in text
+        assert 'command4bot_command_errors_total{command="fail"} 1' in text
+        assert (
+            'command4bot_command_latency_seconds_bucket{command="hello",'
+            'le="+Inf"} 3'
+        ) in text
+        assert 'command4bot_fallback_hits_total{fallback="echo"} 1' in text
+        assert "command4bot_fuzzy_match_seconds_count 1" in text
+        assert "# TYPE command4bot_context_init_seconds histogram" in text
+
+
+def test_disabled():
+    mgr = CommandsManager()
+
+    @mgr.command
+    def hello():
+        return "hello"
+
+    assert mgr.metrics is None
+    assert mgr.command_reg.get("hello").invoke.__name__ != "timed_invoke"
+    with pytest.raises(RuntimeError):
+        mgr.stats()
+
+
+def test_fallback_without_name():
+    mgr = CommandsManager(
+        config=dict(enable_default_fallback=False, enable_metrics=True)
+    )
+
+    def reply(text, content):
+        return text
+
+    fallback = partial(reply, "partial")
+    mgr.fallback(fallback)
+    assert mgr.exec("anything") == "partial"
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(mgr.aexec("anything")) == "partial"
+    loop.close()
+    assert mgr.stats()["fallbacks"] == {repr(fallback): 2}
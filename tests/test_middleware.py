@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+class TestMiddleware:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(
+            enable_default_fallback=False, command_context_ignore=["user"]
+        )
+        data_share.log = []
+
+        @mgr.command
+        def hello(payload, user):
+            return f"hello {payload} from {user}"
+
+        @mgr.command(groups=["admin"])
+        def ban(payload):
+            return f"banned {payload}"
+
+        @mgr.fallback
+        def echo(content, **kwargs):
+            return content
+
+        @mgr.middleware("pre_dispatch")
+        def log(content, kwargs, call_next):
+            data_share.log.append(content)
+            return call_next(content.strip(), kwargs)
+
+        @mgr.middleware("around_handler")
+        def auth(command, payload, kwargs, call_next):
+            if "admin" in command.groups and kwargs.get("user") != "root":
+                return "denied"
+            return call_next(command, payload, kwargs)
+
+        @mgr.middleware("post_result")
+        def upper(content, kwargs, result):
+            return result.upper()
+
+        @mgr.middleware("on_fallback")
+        def quote(content, kwargs, call_next):
+            return f'"{call_next(content, kwargs)}"'
+
+        return mgr
+
+    def test_command(self, mgr: CommandsManager, data_share):
+        assert mgr.exec(" hello world ", user="bob") == "HELLO WORLD FROM BOB"
+        assert data_share.log == [" hello world "]
+
+    def test_around_handler(self, mgr: CommandsManager):
+        assert mgr.exec("ban bob", user="bob") == "DENIED"
+        assert mgr.exec("ban bob", user="root") == "BANNED BOB"
+
+    def test_fallback(self, mgr: CommandsManager):
+        assert mgr.exec("hi", user="bob") == '"HI"'
+
+    def test_exec_many(self, mgr: CommandsManager):
+        assert mgr.exec_many(["hi", "ban bob"], user="bob") == [
+            '"HI"',
+            "DENIED",
+        ]
+
+    def test_aexec(self, mgr: CommandsManager):
+        loop = asyncio.new_event_loop()
+        assert (
+            loop.run_until_complete(mgr.aexec("hello world", user="bob"))
+            == "HELLO WORLD FROM BOB"
+        )
+        assert loop.run_until_complete(mgr.aexec("ban x", user="x")) == (
+            "DENIED"
+        )
+        loop.close()
+
+
+def test_async_middleware():
+    mgr = CommandsManager()
+
+    @mgr.command
+    async def hello():
+        return "hello"
+
+    @mgr.middleware("pre_dispatch")
+    async def exclaim(content, kwargs, call_next):
+        return await call_next(content, kwargs) + "!"
+
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(mgr.aexec("hello")) == "hello!"
+    loop.close()
+
+
+def test_order():
+    mgr = CommandsManager()
+    calls = []
+
+    @mgr.command
+    def hello():
+        calls.append("handler")
+        return "hello"
+
+    for name in ("outer", "inner"):
+
+        @mgr.middleware("around_handler")
+        def record(command, payload, kwargs, call_next, name=name):
+            calls.append(name)
+            return call_next(command, payload, kwargs)
+
+    mgr.exec("hello")
+    assert calls == ["outer", "inner", "handler"]
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        CommandsManager().middleware("unknown")
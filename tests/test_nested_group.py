@@ -0,0 +1,102 @@
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+
+CLOSED = DEFAULT_CONFIG["text_command_closed"]
+
+
+class TestNestedGroup:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager()
+        mgr.add_group("games.card", ["games"])
+
+        @mgr.context
+        def deck():
+            return "deck"
+
+        @mgr.command(groups=["games.card.poker"])
+        def poker(deck):
+            return f"poker with {deck}"
+
+        @mgr.command(groups=["games.card"])
+        def solitaire(deck):
+            return f"solitaire with {deck}"
+
+        @mgr.command(groups=["games"])
+        def dice():
+            return "dice"
+
+        # Added after registering the command
+        mgr.add_group("games.card.poker", ["games.card"])
+        return mgr
+
+    def test_open(self, mgr: CommandsManager):
+        assert mgr.exec("poker") == "poker with deck"
+        assert mgr.exec("dice") == "dice"
+
+    def test_close_root(self, mgr: CommandsManager):
+        mgr.close("games")
+        for keyword in ("poker", "solitaire", "dice"):
+            assert mgr.exec(keyword) == CLOSED
+        assert mgr.context_reg.get("deck").reference_count == 0
+
+    def test_close_subgroup_meanwhile(self, mgr: CommandsManager):
+        mgr.close("games.card")
+        mgr.open("games")
+        assert mgr.exec("dice") == "dice"
+        assert mgr.exec("poker") == CLOSED
+        mgr.open("games.card")
+        assert mgr.exec("poker") == "poker with deck"
+        assert mgr.context_reg.get("deck").reference_count == 2
+
+    def test_batch(self, mgr: CommandsManager):
+        closed, opened = mgr.command_reg.batch_update_status(
+            {"games": False, "games.card": False, "games.card.poker": False}
+        )
+        assert sorted(command.name for command in closed) == [
+            "dice",
+            "poker",
+            "solitaire",
+        ]
+        assert mgr.context_reg.get("deck").reference_count == 2
+        mgr.command_reg.batch_update_status(
+            {"games": True, "games.card": True, "games.card.poker": True}
+        )
+
+    def test_add_closed_parent(self, mgr: CommandsManager):
+        mgr.close("all")
+        mgr.add_group("games", ["all"])
+        assert mgr.exec("poker") == CLOSED
+        assert mgr.context_reg.get("deck").reference_count == 0
+        mgr.open("all")
+        assert mgr.exec("poker") == "poker with deck"
+
+    def test_circular(self, mgr: CommandsManager):
+        with pytest.raises(ValueError):
+            mgr.add_group("all", ["games.card.poker"])
+        with pytest.raises(ValueError):
+            mgr.add_group("games", ["games"])
+
+    def test_command_as_group(self, mgr: CommandsManager):
+        with pytest.raises(ValueError):
+            mgr.add_group("dice", ["games"])
+        with pytest.raises(ValueError):
+            mgr.add_group("games", ["dice"])
+
+
+def test_diamond():
+    mgr = CommandsManager()
+    mgr.add_group("b", ["a"])
+    mgr.add_group("c", ["a"])
+
+    @mgr.command(groups=["b", "c"])
+    def hi():
+        return "hi"
+
+    mgr.add_group("c", ["b"])
+    mgr.close("a")
+    assert mgr.exec("hi") == CLOSED
+    mgr.open("a")
+    assert mgr.exec("hi") == "hi"
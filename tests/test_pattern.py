@@ -0,0 +1,117 @@
+import asyncio
+import re
+
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+
+
+class TestPattern:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(command_context_ignore=["user"])
+        data_share.cleaned = False
+
+        @mgr.context
+        def rng():
+            yield lambda sides: int(sides)
+            data_share.cleaned = True
+
+        @mgr.command(pattern=r"^(?P<count>\d+)d(?P<sides>\d+)$")
+        def dice(count, sides, rng):
+            return int(count) * rng(sides)
+
+        @mgr.command(
+            pattern=re.compile(r"\b(?P<project>[a-z]+)-(?P<number>\d+)\b"),
+            groups=["tickets"],
+        )
+        def ticket(payload, project, number, user="anonymous"):
+            return f"{project}#{number} in '{payload}' for {user}"
+
+        @mgr.command(keywords=["roll"], pattern=r"^roll!(?P<count>\d+)?$")
+        def roll(payload, count="1"):
+            return f"roll {count} {payload}"
+
+        @mgr.command
+        def abc(payload):
+            return f"keyword {payload}"
+
+        return mgr
+
+    def test_groups_as_parameters(self, mgr: CommandsManager):
+        assert mgr.exec("2d6") == 12
+        assert mgr.exec("see abc-12 and xyz-3", user="bob") == (
+            "abc#12 in 'see abc-12 and xyz-3' for bob"
+        )
+
+    def test_keyword_first(self, mgr: CommandsManager):
+        assert mgr.exec("abc-1") == "abc#1 in 'abc-1' for anonymous"
+        assert mgr.exec("abc -1") == "keyword -1"
+        assert mgr.exec("roll 3") == "roll 1 3"
+        assert mgr.exec("roll!") == "roll 1 roll!"
+        assert mgr.exec("roll!4") == "roll 4 roll!4"
+
+    def test_no_match(self, mgr: CommandsManager):
+        assert mgr.exec("2d") == DEFAULT_CONFIG["text_general_response"]
+
+    def test_status(self, mgr: CommandsManager, data_share):
+        closed = DEFAULT_CONFIG["text_command_closed"]
+        mgr.close("tickets")
+        assert mgr.exec("abc-1") == closed
+        mgr.open("tickets")
+        mgr.close("dice")
+        assert mgr.exec("1d2") == closed
+        assert data_share.cleaned
+        mgr.open("dice")
+        assert mgr.exec("1d2") == 2
+
+    def test_exec_many(self, mgr: CommandsManager):
+        assert mgr.exec_many(["1d3", "2d3", "roll!2"]) == [
+            3,
+            6,
+            "roll 2 roll!2",
+        ]
+
+    def test_aexec(self, mgr: CommandsManager):
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(mgr.aexec("3d2")) == 6
+        loop.close()
+
+    def test_submit(self, mgr: CommandsManager):
+        assert mgr.submit("4d2").result(10) == 8
+        mgr.shutdown()
+
+
+def test_case_insensitive():
+    mgr = CommandsManager(command_case_sensitive=False)
+
+    @mgr.command(pattern=r"^hey (?P<name>\w+)$")
+    def greet(name):
+        return f"hi {name}"
+
+    assert mgr.exec("HEY Bob") == "hi Bob"
+
+
+def test_numbered_backreference():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.command(pattern=r"(\w)\1")
+        def double():
+            pass
+
+
+def test_inline_flags():
+    mgr = CommandsManager()
+
+    @mgr.command(pattern=r"(?i)^t(?P<n>\d+)$")
+    def ticket(n):
+        return int(n)
+
+    @mgr.command(pattern="(?x) ^ hello \\s (?P<name>\\w+) $  # greeting")
+    def hello(name):
+        return name
+
+    assert mgr.exec("T12") == 12
+    assert mgr.exec("hello bob") == "bob"
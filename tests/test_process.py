@@ -0,0 +1,122 @@
+import asyncio
+import os
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+def worker_pid():
+    return os.getpid()
+
+
+def scale(worker_pid):
+    return {"pid": worker_pid, "factor": 2}
+
+
+def render(payload, scale, user="anonymous"):
+    return (int(payload) * scale["factor"], scale["pid"], user)
+
+
+def hello():
+    return os.getpid()
+
+
+def with_local(local_context):
+    return local_context
+
+
+decorated_mgr = CommandsManager(process_max_workers=1)
+
+
+@decorated_mgr.command(executor="process")
+def triple(payload):
+    return int(payload) * 3
+
+
+class TestProcess:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(
+            process_max_workers=1, command_context_ignore=["user"]
+        )
+        mgr.context(worker_pid)
+        mgr.context(scale)
+        mgr.command(executor="process")(render)
+        mgr.command(executor="process")(hello)
+        yield mgr
+        mgr.shutdown()
+
+    def test_exec(self, mgr: CommandsManager):
+        value, pid, user = mgr.exec("render 21", user="bob", other=object())
+        assert value == 42
+        assert user == "bob"
+        assert pid != os.getpid()
+        assert mgr.exec("hello") == pid
+
+    def test_worker_cache(self, mgr: CommandsManager):
+        assert mgr.exec("render 1")[1] == mgr.exec("render 2")[1]
+        # Not created in the main process
+        assert not mgr.context_reg.get("scale").is_cached
+
+    def test_aexec(self, mgr: CommandsManager):
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(mgr.aexec("render 1"))[0] == 2
+        loop.close()
+
+    def test_submit(self, mgr: CommandsManager):
+        assert mgr.submit("render 3").result(10)[0] == 6
+
+    def test_exec_in_event_loop(self, mgr: CommandsManager):
+        async def main():
+            return mgr.exec("render 4"), mgr.exec_many(["render 5"])
+
+        loop = asyncio.new_event_loop()
+        result, results = loop.run_until_complete(main())
+        loop.close()
+        assert result[0] == 8
+        assert results[0][0] == 10
+
+    def test_no_references_in_main_process(self, mgr: CommandsManager):
+        mgr.warmup()
+        for name in ("scale", "worker_pid"):
+            assert mgr.context_reg.get(name).reference_count == 0
+            assert not mgr.context_reg.get(name).is_cached
+
+
+def test_decorator_syntax():
+    try:
+        assert decorated_mgr.exec("triple 3") == 9
+    finally:
+        decorated_mgr.shutdown()
+
+
+def test_not_picklable():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.command(executor="process")
+        def local():
+            pass
+
+    def local_context():
+        pass
+
+    mgr.context(local_context)
+    with pytest.raises(ValueError):
+        mgr.command(executor="process")(with_local)
+
+
+def test_coroutine():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.command(executor="process")
+        async def local():
+            pass
+
+
+def test_unknown_executor():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+        mgr.command(executor="gpu")
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from command4bot import CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+from command4bot.ratelimit import RateLimiter, parse_rate
+
+LIMITED = DEFAULT_CONFIG["text_rate_limited"]
+
+
+@pytest.mark.parametrize(
+    "rate, expected",
+    [("5/10s", (5, 10.0)), ("30/m", (30, 60.0)), ("1 / 0.5h", (1, 1800.0))],
+)
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == expected
+
+
+@pytest.mark.parametrize("rate", ["5", "0/s", "5/0s", "5/10x", "a/s"])
+def test_parse_invalid_rate(rate):
+    with pytest.raises(ValueError):
+        parse_rate(rate)
+
+
+class TestRateLimit:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(command_context_ignore=["user_id"])
+        data_share.resolved = 0
+
+        @mgr.context
+        def backend():
+            data_share.resolved += 1
+            return "backend"
+
+        @mgr.command(rate_limit="2/h", per="user_id")
+        def search(payload, backend, user_id):
+            return payload
+
+        @mgr.command(rate_limit="1/h")
+        def shout(payload):
+            return payload
+
+        return mgr
+
+    def test_per_user(self, mgr: CommandsManager):
+        assert mgr.exec("search a", user_id=1) == "a"
+        assert mgr.exec("search b", user_id=1) == "b"
+        assert mgr.exec("search c", user_id=1) == LIMITED
+        assert mgr.exec("search d", user_id=2) == "d"
+
+    def test_before_contexts(self, mgr: CommandsManager, data_share):
+        data_share.resolved = 0
+        mgr.invalidate("backend")
+        mgr.exec("search e", user_id=1)
+        assert data_share.resolved == 0
+
+    def test_global(self, mgr: CommandsManager):
+        assert mgr.exec("shout a", user_id=1) == "a"
+        assert mgr.exec("shout b", user_id=2) == LIMITED
+
+    def test_exec_many(self, mgr: CommandsManager):
+        assert mgr.exec_many(["search x", "search y"], user_id=3) == [
+            "x",
+            "y",
+        ]
+        assert mgr.exec_many(["search z"], user_id=3) == [LIMITED]
+
+
+def test_refill(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("command4bot.ratelimit.time.monotonic", lambda: now[0])
+    limiter = RateLimiter("2/10s")
+    assert limiter.allow({})
+    assert limiter.allow({})
+    assert not limiter.allow({})
+    now[0] = 5.0
+    assert limiter.allow({})
+    assert not limiter.allow({})
+    now[0] = 100.0
+    assert limiter.allow({})
+    assert limiter.allow({})
+    assert not limiter.allow({})
+
+
+def test_bounded():
+    limiter = RateLimiter("1/h", per="user", maxsize=2)
+    for user in range(3):
+        assert limiter.allow({"user": user})
+    # The bucket of user 0 is discarded
+    assert limiter.allow({"user": 0})
+    assert len(limiter._buckets) == 2
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError):
+        RateLimiter("1/10s", maxsize=0)
+
+
+def test_thread_safe():
+    limiter = RateLimiter("100/h")
+    allowed = []
+
+    def worker():
+        for _ in range(50):
+            allowed.append(limiter.allow({}))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 100
+
+
+def test_per_without_rate():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.command(per="user_id")
+        def hello():
+            pass
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from command4bot import CommandsManager, LRUCache
+
+
+class TestResultCache:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(command_context_ignore=["lang", "user"])
+        data_share.calls = 0
+
+        @mgr.context
+        def rates():
+            yield {"usd": 7}
+
+        @mgr.command(
+            groups=["convert"], cache=LRUCache(16), cache_kwargs=["lang"]
+        )
+        def usd(payload, rates, lang="en"):
+            data_share.calls += 1
+            return f"{lang}: {int(payload) * rates['usd']}"
+
+        return mgr
+
+    def test_cached(self, mgr: CommandsManager, data_share):
+        assert mgr.exec("usd 2") == "en: 14"
+        assert mgr.exec("usd 2", user="bob") == "en: 14"
+        assert data_share.calls == 1
+        assert mgr.cache_info()["usd"] == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_cache_kwargs(self, mgr: CommandsManager, data_share):
+        assert mgr.exec("usd 2", lang="zh") == "zh: 14"
+        assert mgr.exec("usd 3") == "en: 21"
+        assert data_share.calls == 3
+
+    def test_exec_many(self, mgr: CommandsManager, data_share):
+        assert mgr.exec_many(["usd 2", "usd 3"]) == ["en: 14", "en: 21"]
+        assert data_share.calls == 3
+
+    def test_clear_on_close(self, mgr: CommandsManager, data_share):
+        mgr.close("convert")
+        assert mgr.cache_info()["usd"]["size"] == 0
+        mgr.open("convert")
+        mgr.exec("usd 2")
+        assert data_share.calls == 4
+
+    def test_clear_on_refresh(self, mgr: CommandsManager, data_share):
+        mgr.invalidate("rates")
+        mgr.exec("usd 2")
+        assert data_share.calls == 5
+        mgr.exec("usd 2")
+        assert data_share.calls == 5
+
+    def test_aexec(self, mgr: CommandsManager, data_share):
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(mgr.aexec("usd 2")) == "en: 14"
+        assert loop.run_until_complete(mgr.aexec("usd 4")) == "en: 28"
+        loop.close()
+        assert data_share.calls == 6
+
+
+def test_async_handler():
+    mgr = CommandsManager()
+    calls = []
+
+    @mgr.command(cache=LRUCache())
+    async def hello(payload):
+        calls.append(payload)
+        return payload
+
+    loop = asyncio.new_event_loop()
+    for _ in range(2):
+        assert loop.run_until_complete(mgr.aexec("hello x")) == "x"
+    loop.close()
+    assert calls == ["x"]
+
+
+def test_context_ttl():
+    mgr = CommandsManager()
+    tokens = iter(range(10))
+
+    @mgr.context(ttl=0.05)
+    def token():
+        return next(tokens)
+
+    @mgr.command(cache=LRUCache())
+    def show(token):
+        return token
+
+    assert mgr.exec("show") == 0
+    assert mgr.exec("show") == 0
+    time.sleep(0.06)
+    assert mgr.exec("show") == 1
+    assert mgr.exec("show") == 1
+    time.sleep(0.06)
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(mgr.aexec("show")) == 2
+    loop.close()
+
+
+def test_cache_kwargs_without_cache():
+    mgr = CommandsManager()
+    with pytest.raises(ValueError):
+
+        @mgr.command(cache_kwargs=["user"])
+        def hello():
+            pass
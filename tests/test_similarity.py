@@ -0,0 +1,100 @@
+import random
+import string
+from difflib import get_close_matches
+
+import pytest
+
+from command4bot import (
+    CommandRegistry,
+    CommandsManager,
+    DifflibIndex,
+    NGramIndex,
+)
+
+
+def random_keywords(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return list(
+        {
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+            for _ in range(count)
+        }
+    )
+
+
+def misspell(keyword: str, rng: random.Random) -> str:
+    i = rng.randrange(len(keyword))
+    return keyword[:i] + rng.choice(string.ascii_lowercase) + keyword[i + 1 :]
+
+
+class TestNGramIndex:
+    @pytest.fixture(scope="class")
+    def keywords(self):
+        return random_keywords(500)
+
+    @pytest.fixture(scope="class")
+    def indexes(self, keywords):
+        ngram, difflib = NGramIndex(), DifflibIndex()
+        for keyword in keywords:
+            ngram.add(keyword)
+            difflib.add(keyword)
+        return ngram, difflib
+
+    def test_same_as_difflib(self, keywords, indexes):
+        ngram, difflib = indexes
+        rng = random.Random(1)
+        for keyword in rng.sample(keywords, 100):
+            query = misspell(keyword, rng)
+            assert ngram.search(query) == difflib.search(query)
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_same_as_difflib_any_order(self, keywords, seed):
+        rng = random.Random(seed)
+        ngram, difflib = NGramIndex(max_candidates=None), DifflibIndex()
+        for keyword in rng.sample(keywords, len(keywords)):
+            ngram.add(keyword)
+            difflib.add(keyword)
+        for keyword in rng.sample(keywords, 20):
+            query = misspell(keyword, rng) + rng.choice(string.ascii_lowercase)
+            assert ngram.search(query) == difflib.search(query)
+
+    def test_no_shared_bigram(self):
+        index = NGramIndex()
+        for keyword in ("xgea", "oxig"):
+            index.add(keyword)
+        # "xgea" shares no bigram with the input, but has ratio 0.6
+        assert index.search("ixigre") == get_close_matches(
+            "ixigre", ["xgea", "oxig"]
+        )
+
+    def test_exact_keyword_first(self, keywords, indexes):
+        ngram, _ = indexes
+        assert ngram.search(keywords[0])[0] == keywords[0]
+
+    def test_no_match(self, indexes):
+        ngram, difflib = indexes
+        assert ngram.search("0123456789") == difflib.search("0123456789")
+        assert ngram.search("") == []
+
+    def test_cutoff(self):
+        index = NGramIndex(cutoff=0.9)
+        index.add("world")
+        assert index.search("word") == []
+        index.cutoff = 0.6
+        assert index.search("word") == ["world"]
+
+
+def test_custom_index():
+    mgr = CommandsManager(
+        command_reg=CommandRegistry(similarity_index=DifflibIndex(n=1))
+    )
+
+    @mgr.command
+    def world():
+        "Say world"
+
+    @mgr.command
+    def words():
+        "Say words"
+
+    assert mgr.get_possible_keywords_help("word") == ["- Say world"]
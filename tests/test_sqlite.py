@@ -0,0 +1,86 @@
+import multiprocessing
+
+import pytest
+
+from command4bot import CommandsManager, SQLiteCommandRegistry
+from command4bot.manager import DEFAULT_CONFIG
+
+CLOSED = DEFAULT_CONFIG["text_command_closed"]
+
+
+def make_manager(path):
+    mgr = CommandsManager(command_reg=SQLiteCommandRegistry(path))
+    mgr.command_reg.mark_default_closed("secret")
+
+    @mgr.command(groups=["fun"])
+    def joke():
+        return "joke"
+
+    @mgr.command
+    def secret():
+        return "secret"
+
+    mgr.sync_status()
+    return mgr
+
+
+def close_in_other_process(path, name):
+    make_manager(path).close(name)
+
+
+class TestSQLiteRegistry:
+    @pytest.fixture(scope="class")
+    def path(self, tmp_path_factory):
+        return str(tmp_path_factory.mktemp("status") / "status.db")
+
+    @pytest.fixture(scope="class")
+    def managers(self, path):
+        return make_manager(path), make_manager(path)
+
+    def test_default(self, managers):
+        for mgr in managers:
+            assert mgr.exec("joke") == "joke"
+            assert mgr.exec("secret") == CLOSED
+
+    def test_close(self, managers):
+        first, second = managers
+        first.close("fun")
+        assert first.exec("joke") == CLOSED
+        assert second.exec("joke") == "joke"
+        assert second.sync_status() == {"fun": False}
+        assert second.exec("joke") == CLOSED
+
+    def test_no_op_sync(self, managers):
+        first, second = managers
+        version = second.command_reg.synced_version
+        assert first.sync_status() == {}
+        assert second.sync_status() == {}
+        assert second.command_reg.synced_version == version
+
+    def test_open_default_closed(self, managers):
+        first, second = managers
+        second.open("secret")
+        assert first.sync_status() == {"secret": True}
+        assert first.exec("secret") == "secret"
+
+    def test_no_write_back(self, managers):
+        first, second = managers
+        version = first.command_reg.read_version()
+        first.open("fun")
+        second.sync_status()
+        assert first.command_reg.read_version() == version + 1
+
+    def test_new_manager(self, path):
+        mgr = make_manager(path)
+        assert mgr.exec("secret") == "secret"
+
+    def test_other_process(self, path, managers):
+        process = multiprocessing.Process(
+            target=close_in_other_process, args=(path, "joke")
+        )
+        process.start()
+        process.join(10)
+        assert process.exitcode == 0
+        for mgr in managers:
+            assert mgr.sync_status() == {"joke": False}
+            assert mgr.exec("joke") == CLOSED
@@ -0,0 +1,80 @@
+import pytest
+
+from command4bot import CommandRegistry, CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+
+
+class CountingCommandRegistry(CommandRegistry):
+    def __init__(self):
+        super().__init__()
+        self.get_status_calls = 0
+
+    def get_status(self, name: str) -> bool:
+        self.get_status_calls += 1
+        return super().get_status(name)
+
+
+class TestStatusCache:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(command_reg=CountingCommandRegistry())
+
+        @mgr.command(groups=["a", "b", "c"])
+        def hi():
+            return "hi"
+
+        @mgr.command(groups=["b"])
+        def aloha():
+            return "aloha"
+
+        return mgr
+
+    def test_exec_no_status_lookup(self, mgr: CommandsManager):
+        mgr.command_reg.get_status_calls = 0  # type: ignore
+        for _ in range(10):
+            assert mgr.exec("hi") == "hi"
+        assert mgr.command_reg.get_status_calls == 0  # type: ignore
+
+    def test_overlapping_groups(self, mgr: CommandsManager):
+        closed = DEFAULT_CONFIG["text_command_closed"]
+        mgr.close("a")
+        mgr.close("b")
+        assert mgr.exec("hi") == closed
+        assert mgr.exec("aloha") == closed
+        mgr.open("b")
+        assert mgr.exec("hi") == closed
+        assert mgr.exec("aloha") == "aloha"
+        mgr.open("a")
+        assert mgr.exec("hi") == "hi"
+
+    def test_open_close_idempotent(self, mgr: CommandsManager):
+        assert list(mgr.command_reg.close("c")) == [mgr.command_reg.get("hi")]
+        assert list(mgr.command_reg.close("c")) == []
+        assert list(mgr.command_reg.open("c")) == [mgr.command_reg.get("hi")]
+        assert list(mgr.command_reg.open("c")) == []
+
+    def test_batch_each_command_once(self, mgr: CommandsManager):
+        reg = mgr.command_reg
+        hi, aloha = reg.get("hi"), reg.get("aloha")
+        assert reg.batch_update_status({"a": False, "b": False}) == (
+            [hi, aloha],
+            [],
+        )
+        # hi stays closed by "c", while "a" and "b" are net opened
+        assert reg.batch_update_status({"a": True, "b": True, "c": False}) == (
+            [],
+            [aloha],
+        )
+        assert reg.batch_update_status({"c": True, "d": True}) == ([], [hi])
+        assert "d" not in reg._groups
+
+
+def test_mark_group_default_closed_after_register():
+    mgr = CommandsManager()
+
+    @mgr.command(groups=["hello"])
+    def hi():
+        return "hi"
+
+    with pytest.raises(ValueError):
+        mgr.command_reg.mark_default_closed("hello")
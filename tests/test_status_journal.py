@@ -0,0 +1,72 @@
+import pytest
+
+from command4bot import CommandRegistry, CommandsManager
+from command4bot.manager import DEFAULT_CONFIG
+
+CLOSED = DEFAULT_CONFIG["text_command_closed"]
+
+
+def make_manager(**kwargs):
+    mgr = CommandsManager(command_reg=CommandRegistry(**kwargs))
+
+    @mgr.command(groups=["fun"])
+    def joke():
+        return "joke"
+
+    @mgr.command
+    def hello():
+        return "hello"
+
+    return mgr
+
+
+class TestJournal:
+    @pytest.fixture(scope="class")
+    def leader(self):
+        return make_manager()
+
+    @pytest.fixture(scope="class")
+    def follower(self):
+        return make_manager()
+
+    def test_no_changes(self, leader: CommandsManager):
+        assert leader.command_reg.changes_since(0) == (0, {})
+
+    def test_net_changes(self, leader: CommandsManager):
+        leader.close("fun")
+        leader.close("hello")
+        leader.open("fun")
+        leader.close("hello")  # already closed, not recorded
+        leader.open("fun")
+        assert leader.command_reg.version == 3
+        assert leader.command_reg.changes_since(0) == (
+            3,
+            {"fun": True, "hello": False},
+        )
+        assert leader.command_reg.changes_since(2) == (3, {"fun": True})
+
+    def test_follow(self, leader: CommandsManager, follower: CommandsManager):
+        version, changes = leader.command_reg.changes_since(0)
+        follower.batch_update_status(changes)
+        assert follower.exec("hello") == CLOSED
+        assert follower.exec("joke") == "joke"
+        assert leader.command_reg.changes_since(version) == (version, {})
+
+    def test_future_version(self, leader: CommandsManager):
+        assert leader.command_reg.changes_since(100) == (3, None)
+
+
+def test_truncated_journal():
+    mgr = make_manager(journal_size=2)
+    mgr.command_reg.mark_default_closed("secret")
+    for name in ("fun", "hello", "joke"):
+        mgr.close(name)
+    assert mgr.command_reg.changes_since(1) == (
+        3,
+        {"hello": False, "joke": False},
+    )
+    assert mgr.command_reg.changes_since(0) == (3, None)
+    assert mgr.command_reg.status_snapshot() == (
+        3,
+        {"secret": False, "fun": False, "hello": False, "joke": False},
+    )
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+class TestSubmit:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager(executor_max_workers=4)
+        data_share.running = 0
+        data_share.max_running = 0
+        data_share.lock = threading.Lock()
+        data_share.release = threading.Event()
+
+        @mgr.command(groups=["slow"])
+        def render(payload):
+            with data_share.lock:
+                data_share.running += 1
+                data_share.max_running = max(
+                    data_share.max_running, data_share.running
+                )
+            data_share.release.wait(5)
+            with data_share.lock:
+                data_share.running -= 1
+            return payload
+
+        @mgr.command
+        def hello():
+            return "hello"
+
+        mgr.bulkhead("slow", 2)
+        yield mgr
+        mgr.shutdown()
+
+    def test_result(self, mgr: CommandsManager):
+        assert mgr.submit("hello").result(5) == "hello"
+
+    def test_fallback(self, mgr: CommandsManager):
+        assert mgr.submit("hellp").result(5).endswith("hello")
+
+    def test_bulkhead(self, mgr: CommandsManager, data_share):
+        futures = [mgr.submit(f"render {i}") for i in range(6)]
+        time.sleep(0.1)
+        # Queued calls do not occupy workers
+        assert mgr.submit("hello").result(5) == "hello"
+        data_share.release.set()
+        assert [future.result(5) for future in futures] == [
+            str(i) for i in range(6)
+        ]
+        assert data_share.max_running == 2
+
+    def test_invalid_limit(self, mgr: CommandsManager):
+        with pytest.raises(ValueError):
+            mgr.bulkhead("slow", 0)
+
+
+def test_deferred_cleanup():
+    mgr = CommandsManager()
+    events = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @mgr.context
+    def conn():
+        events.append("open")
+        yield "conn"
+        events.append("close")
+
+    @mgr.command
+    def query(conn):
+        started.set()
+        release.wait(5)
+        events.append(f"used {conn}")
+        return conn
+
+    future = mgr.submit("query")
+    started.wait(5)
+    mgr.close("query")
+    assert events == ["open"]
+    release.set()
+    assert future.result(5) == "conn"
+    assert events == ["open", "used conn", "close"]
+    mgr.shutdown()
+
+
+def test_deferred_cleanup_reopened():
+    mgr = CommandsManager()
+    events = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @mgr.context
+    def conn():
+        events.append("open")
+        yield "conn"
+        events.append("close")
+
+    @mgr.command
+    def query(conn):
+        started.set()
+        release.wait(5)
+        return conn
+
+    future = mgr.submit("query")
+    started.wait(5)
+    mgr.close("query")
+    mgr.open("query")
+    release.set()
+    future.result(5)
+    assert events == ["open"]
+    mgr.shutdown()
+
+
+def test_shutdown_cancels_queued():
+    mgr = CommandsManager()
+    release = threading.Event()
+
+    @mgr.command
+    def slow():
+        release.wait(5)
+        return "done"
+
+    mgr.bulkhead("slow", 1)
+    running = mgr.submit("slow")
+    queued = mgr.submit("slow")
+    mgr.shutdown(wait=False)
+    release.set()
+    assert running.result(5) == "done"
+    assert queued.cancelled()
+
+
+def test_shutdown_waits_queued():
+    mgr = CommandsManager()
+
+    @mgr.command
+    def slow():
+        time.sleep(0.01)
+        return "done"
+
+    mgr.bulkhead("slow", 1)
+    futures = [mgr.submit("slow") for _ in range(3)]
+    mgr.shutdown()
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == ["done"] * 3
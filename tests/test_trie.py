@@ -0,0 +1,75 @@
+import pytest
+
+from command4bot import CommandRegistry, CommandsManager
+from command4bot.trie import KeywordTrie
+
+
+class TestTrieDispatch:
+    @pytest.fixture(scope="class")
+    def mgr(self):
+        mgr = CommandsManager(
+            command_reg=CommandRegistry(trie=True),
+            command_case_sensitive=False,
+        )
+
+        @mgr.command
+        def admin(payload):
+            return f"admin: {payload}"
+
+        @mgr.command(keywords=["admin ban"])
+        def ban(payload):
+            return f"ban: {payload}"
+
+        @mgr.command(keywords=["admin ban all"])
+        def ban_all(payload):
+            return f"ban all: {payload}"
+
+        @mgr.command(keywords=["/r"], prefix=True)
+        def roll(payload):
+            return f"roll: {payload}"
+
+        return mgr
+
+    @pytest.mark.parametrize(
+        "content,result",
+        [
+            ("admin", "admin: "),
+            ("admin kick bob", "admin: kick bob"),
+            ("admin ban bob", "ban: bob"),
+            ("ADMIN Ban bob", "ban: bob"),
+            ("admin ban", "ban: "),
+            ("admin banana", "admin: banana"),
+            ("admin ban all now", "ban all: now"),
+            ("admin ban al", "ban: al"),
+            ("/r123", "roll: 123"),
+            ("/r 2d6", "roll: 2d6"),
+        ],
+    )
+    def test_longest_match(self, mgr: CommandsManager, content, result):
+        assert mgr.exec(content) == result
+
+    def test_no_match(self, mgr: CommandsManager):
+        assert mgr.command_reg.match("administrator x") == (None, "x")
+
+    def test_exec_many(self, mgr: CommandsManager):
+        assert mgr.exec_many(["admin ban bob", "admin bob"]) == [
+            "ban: bob",
+            "admin: bob",
+        ]
+
+
+def test_prefix_requires_trie():
+    mgr = CommandsManager()
+
+    with pytest.raises(ValueError) as e_info:
+
+        @mgr.command(prefix=True)
+        def r(payload):
+            pass
+
+    assert "trie" in e_info.value.args[0]
+
+
+def test_empty_keyword():
+    with pytest.raises(ValueError):
+        KeywordTrie().insert("", None)
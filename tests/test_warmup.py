@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from command4bot import CommandsManager
+
+
+def slow_manager(data_share, delay=0.1):
+    mgr = CommandsManager()
+    data_share.threads = set()
+
+    @mgr.context
+    def model():
+        data_share.threads.add(threading.get_ident())
+        time.sleep(delay)
+        return "model"
+
+    @mgr.context
+    def auth():
+        data_share.threads.add(threading.get_ident())
+        time.sleep(delay)
+        return "auth"
+
+    @mgr.context
+    def unused():
+        raise AssertionError("Should not be initialised")
+
+    @mgr.command
+    def predict(model, auth):
+        return f"{model} {auth}"
+
+    @mgr.command
+    @mgr.command_reg.mark_default_closed
+    def hidden(unused):
+        pass
+
+    return mgr
+
+
+class TestWarmup:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        return slow_manager(data_share)
+
+    def test_concurrent(self, mgr: CommandsManager, data_share):
+        start = time.monotonic()
+        mgr.warmup()
+        assert time.monotonic() - start < 0.19
+        assert len(data_share.threads) == 2
+        assert mgr.context_reg.get("model").is_cached
+        assert mgr.context_reg.get("auth").is_cached
+        assert not mgr.context_reg.get("unused").is_cached
+
+    def test_exec_after_warmup(self, mgr: CommandsManager):
+        start = time.monotonic()
+        assert mgr.exec("predict") == "model auth"
+        assert time.monotonic() - start < 0.05
+
+
+def test_awarmup(data_share):
+    mgr = slow_manager(data_share, delay=0)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(mgr.awarmup())
+    finally:
+        loop.close()
+    assert mgr.context_reg.get("model").is_cached
+    assert not mgr.context_reg.get("unused").is_cached
+
+
+def test_awarmup_not_blocking(data_share):
+    mgr = slow_manager(data_share)
+
+    @mgr.context
+    async def session(auth):
+        return f"session {auth}"
+
+    @mgr.command
+    async def login(session):
+        return session
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        start = time.monotonic()
+        await mgr.awarmup()
+        elapsed = time.monotonic() - start
+        ticker.cancel()
+        return elapsed, ticks
+
+    loop = asyncio.new_event_loop()
+    try:
+        elapsed, ticks = loop.run_until_complete(main())
+    finally:
+        loop.close()
+    assert elapsed < 0.19
+    assert ticks >= 3
+    assert len(data_share.threads) == 2
+    assert mgr.context_reg.get("session").cached_value == "session auth"
+
+
+class TestEagerOpen:
+    @pytest.fixture(scope="class")
+    def mgr(self, data_share):
+        mgr = CommandsManager()
+        data_share.ready = threading.Event()
+
+        @mgr.context
+        def db():
+            data_share.ready.set()
+            return "db"
+
+        @mgr.command
+        @mgr.command_reg.mark_default_closed
+        def query(db):
+            return db
+
+        @mgr.command
+        @mgr.command_reg.mark_default_closed
+        def report(db):
+            return db
+
+        yield mgr
+        mgr.shutdown()
+
+    def test_lazy_open(self, mgr: CommandsManager, data_share):
+        mgr.open("query")
+        assert not data_share.ready.wait(0.05)
+        mgr.close("query")
+
+    def test_eager_open(self, mgr: CommandsManager, data_share):
+        mgr.open("query", eager=True)
+        assert data_share.ready.wait(1)
+        assert mgr.context_reg.get("db").is_cached
+
+    def test_eager_batch(self, mgr: CommandsManager, data_share):
+        mgr.batch_update_status({"query": False, "report": False})
+        assert not mgr.context_reg.get("db").is_cached
+        data_share.ready.clear()
+        mgr.batch_update_status({"report": True}, eager=True)
+        assert data_share.ready.wait(1)